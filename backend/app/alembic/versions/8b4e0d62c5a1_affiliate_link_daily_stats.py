@@ -0,0 +1,62 @@
+"""affiliate link daily stats
+
+Revision ID: 8b4e0d62c5a1
+Revises: 3f1c2a7d9b10
+Create Date: 2026-10-18 11:03:17.240561
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b4e0d62c5a1'
+down_revision: Union[str, None] = '3f1c2a7d9b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'affiliate_link_daily_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('link_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('clicks', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('purchases', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('earnings', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['link_id'], ['affiliate_link.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('link_id', 'day', name='uq_affiliate_link_daily_stats_link_day'),
+    )
+    op.create_index(op.f('ix_affiliate_link_daily_stats_link_id'), 'affiliate_link_daily_stats', ['link_id'], unique=False)
+    op.create_index(op.f('ix_affiliate_link_daily_stats_day'), 'affiliate_link_daily_stats', ['day'], unique=False)
+
+    # Backfill from the raw click and purchase history
+    op.execute("""
+        INSERT INTO affiliate_link_daily_stats (link_id, day, clicks, purchases, earnings)
+        SELECT link_id, day, SUM(clicks), SUM(purchases), SUM(earnings)
+        FROM (
+            SELECT link_id, (created_at AT TIME ZONE 'UTC')::date AS day,
+                   COUNT(id) AS clicks, 0 AS purchases, 0 AS earnings
+            FROM affiliate_link_click
+            GROUP BY link_id, day
+            UNION ALL
+            SELECT link_id, (created_at AT TIME ZONE 'UTC')::date AS day,
+                   0 AS clicks, COUNT(id) AS purchases, COALESCE(SUM(amount), 0) AS earnings
+            FROM affiliate_link_purchase
+            GROUP BY link_id, day
+        ) AS daily
+        WHERE link_id IS NOT NULL
+        GROUP BY link_id, day
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_affiliate_link_daily_stats_day'), table_name='affiliate_link_daily_stats')
+    op.drop_index(op.f('ix_affiliate_link_daily_stats_link_id'), table_name='affiliate_link_daily_stats')
+    op.drop_table('affiliate_link_daily_stats')
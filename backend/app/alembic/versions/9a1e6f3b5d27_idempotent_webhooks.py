@@ -0,0 +1,46 @@
+"""idempotent webhooks
+
+Revision ID: 9a1e6f3b5d27
+Revises: 4d7f2c9e0a13
+Create Date: 2026-10-18 15:36:41.550832
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a1e6f3b5d27'
+down_revision: Union[str, None] = '4d7f2c9e0a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('webhook_event', sa.Column('idempotency_key', sa.String(), nullable=True))
+    op.create_unique_constraint('uq_webhook_event_idempotency_key', 'webhook_event', ['idempotency_key'])
+
+    # Concurrent webhook deliveries left duplicate transactions behind; keep the oldest of each
+    op.execute("""
+        UPDATE purchase SET transaction_id = keep.id
+        FROM "transaction" t
+        JOIN (SELECT transaction_id, min(id) AS id FROM "transaction" GROUP BY transaction_id) keep
+          ON keep.transaction_id = t.transaction_id
+        WHERE purchase.transaction_id = t.id AND t.id <> keep.id
+    """)
+    op.execute("""
+        DELETE FROM "transaction" t
+        USING "transaction" keep
+        WHERE keep.transaction_id = t.transaction_id AND keep.id < t.id
+    """)
+    op.create_unique_constraint('uq_transaction_transaction_id', 'transaction', ['transaction_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_transaction_transaction_id', 'transaction', type_='unique')
+    op.drop_constraint('uq_webhook_event_idempotency_key', 'webhook_event', type_='unique')
+    op.drop_column('webhook_event', 'idempotency_key')
@@ -0,0 +1,29 @@
+"""coupon reservation
+
+Revision ID: b6c0d8e24f51
+Revises: 9a1e6f3b5d27
+Create Date: 2026-10-18 16:28:03.914466
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6c0d8e24f51'
+down_revision: Union[str, None] = '9a1e6f3b5d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('transaction_processing', sa.Column('coupon_reserved', sa.Boolean(), server_default='false', nullable=False))
+    op.execute("UPDATE coupon SET used = 0 WHERE used IS NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('transaction_processing', 'coupon_reserved')
@@ -0,0 +1,43 @@
+"""backfill purchase amount
+
+Revision ID: c27a5e914f3d
+Revises: 8b4e0d62c5a1
+Create Date: 2026-10-18 12:41:05.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c27a5e914f3d'
+down_revision: Union[str, None] = '8b4e0d62c5a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Older purchases have no recorded amount; fall back to the current item price
+    op.execute("""
+        UPDATE purchase SET amount = course.price
+        FROM course
+        WHERE purchase.amount IS NULL
+          AND purchase.item_type = 'course'
+          AND course.id = purchase.item_id
+    """)
+    op.execute("""
+        UPDATE purchase SET amount = e_book.price
+        FROM e_book
+        WHERE purchase.amount IS NULL
+          AND purchase.item_type = 'ebook'
+          AND e_book.id = purchase.item_id
+    """)
+    op.create_index(op.f('ix_purchase_created_at'), 'purchase', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_purchase_created_at'), table_name='purchase')
@@ -0,0 +1,28 @@
+"""dashboard refresh request
+
+Revision ID: d81f4a6c3e90
+Revises: b6c0d8e24f51
+Create Date: 2026-10-18 19:12:40.518233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f4a6c3e90'
+down_revision: Union[str, None] = 'b6c0d8e24f51'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('admin_dashboard_snapshot', sa.Column('refresh_requested_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('admin_dashboard_snapshot', 'refresh_requested_at')
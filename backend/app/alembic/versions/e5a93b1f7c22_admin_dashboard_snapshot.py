@@ -0,0 +1,34 @@
+"""admin dashboard snapshot
+
+Revision ID: e5a93b1f7c22
+Revises: c27a5e914f3d
+Create Date: 2026-10-18 13:20:44.902716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a93b1f7c22'
+down_revision: Union[str, None] = 'c27a5e914f3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'admin_dashboard_snapshot',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('as_of', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('admin_dashboard_snapshot')
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from core.deps import get_current_user
-from db.session import get_db
+from db.session import get_db,get_async_db,AsyncSessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
 from crud.admin_dashboard import *
 from fastapi import Query
-from core.deps import is_admin_user
+from core.deps import is_admin_user,is_admin_user_async
 from schemas.course import ItemListResponse
 from crud.auth import get_user_by_user_id,get_user_by_id
 from schemas.user import UserResponse
@@ -12,19 +13,12 @@ router = APIRouter()
 
 
 @router.get('/dashboard')
-def get_dashboard(db:Session=Depends(get_db),current_user:User=Depends(is_admin_user)):
-    
-    response = {
-        "overview":{},
-        "line_graph":{},
-        "withdrawals":{},
-    }
-    response['overview']['total_users'] = get_total_users(db)
-    response['overview']['total_courses'] = get_total_courses(db)
-    response['overview']['total_ebooks'] =  get_total_ebooks(db)
-    response['overview']['total_sales'] = get_total_sales(db)
-    response['withdrawals']['total_paid_withdrawals'] = get_total_withdrawals_by_status(db,'success')
-    response['withdrawals']['total_pending_withdrawals'] = get_total_withdrawals_by_status(db,'pending')
-    response['withdrawals']['total_withdrawals'] = get_total_withdrawals_by_status(db,'')
-    response['line_graph']['total_users'] = get_total_sales_by_month_last_year(db)
-    return response
+async def get_dashboard(db:AsyncSession=Depends(get_async_db),current_user:User=Depends(is_admin_user_async)):
+    # db may be a read replica, so a missing snapshot is built on the primary
+    snapshot = await db.run_sync(get_admin_dashboard_snapshot, False)
+    if snapshot is None:
+        async with AsyncSessionLocal() as primary:
+            snapshot = await primary.run_sync(get_admin_dashboard_snapshot)
+    if not snapshot:
+        raise HTTPException(status_code=503, detail="Dashboard is being generated, try again shortly")
+    return {**snapshot.payload, "as_of": snapshot.as_of}
@@ -3,13 +3,18 @@ from sqlalchemy.orm import Session
 from core.security import create_access_token
 from core.deps import get_current_user,is_admin_user
 from models.user import User
-from db.session import get_db
+from db.session import get_db,get_read_db
 from schemas.affiliate import *
+from schemas.common import PAGINATION_COUNT_MODES
 from crud.affiliate import *
 from core.deps import get_current_user
 from crud.auth import get_user_by_user_id
 from crud.purchase import get_item_by_id_and_type
 from models.affiliate import UPIDetails,BankDetails
+from lib.click_buffer import click_buffer,link_id_cache
+from lib.dashboard_refresher import dashboard_refresher
+from crud.user_dashboard import invalidate_affiliate_dashboard
+from core.config import settings
 router = APIRouter()
 
 @router.post('/create', response_model=AffiliateLinkResponse)
@@ -26,11 +31,7 @@ def create_affiliate_link_(
     affiliate_link = create_affiliate_link(db, data_dict)
     return affiliate_link
 
-@router.post('/click/add')       
-def add_clicks_to_affiliate_link_(
-    data:AddAffiliateLinkClicks,
-    db: Session = Depends(get_db),
-):  
+def _resolve_click_affiliate_link(db: Session, data: AddAffiliateLinkClicks):
     user = get_user_by_user_id(db, data.affiliate_user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Affiliate user not found.")
@@ -45,9 +46,33 @@ def add_clicks_to_affiliate_link_(
             'item_id': data.item_id,
             'item_type': data.item_type,
         })
-    updated_link = add_clicks_to_affiliate_link(db, affiliate_link)
+    return affiliate_link
+
+@router.post('/click/add')       
+def add_clicks_to_affiliate_link_(
+    data:AddAffiliateLinkClicks,
+    db: Session = Depends(get_db),
+):  
+    if not settings.CLICK_BUFFER_ENABLED:
+        affiliate_link = _resolve_click_affiliate_link(db, data)
+        add_clicks_to_affiliate_link(db, affiliate_link)
+        invalidate_affiliate_dashboard(affiliate_link.user_id)
+        return {'status':True}
+
+    # Buffered mode: resolve the link id (cached per process) and enqueue the click
+    cache_key = (str(data.affiliate_user_id), str(data.item_id), data.item_type)
+    link = link_id_cache.get(cache_key)
+    if link is None:
+        affiliate_link = _resolve_click_affiliate_link(db, data)
+        link = (affiliate_link.id, affiliate_link.user_id)
+        link_id_cache.set(cache_key, link)
+    click_buffer.add(*link)
     return {'status':True}
 
+@router.get('/click/metrics')
+def get_click_buffer_metrics(current_user:User=Depends(is_admin_user)):
+    return {"enabled": settings.CLICK_BUFFER_ENABLED, **click_buffer.metrics()}
+
 @router.post('/withdraw', response_model=WithdrawResponse)
 def create_user_dashboard_withdraw(
     data: WithdrawCreate,
@@ -69,6 +94,8 @@ def create_user_dashboard_withdraw(
 
     # update account details
     update_or_create_account_details(db,affiliate_account,data)
+    invalidate_affiliate_dashboard(current_user.id)
+    dashboard_refresher.request_refresh()
 
     return db_withdraw
 
@@ -85,14 +112,16 @@ def get_bank_account_details(db:Session=Depends(get_db),user:User=Depends(get_cu
 
 @router.get('/withdrawals')
 def get_withdrawals(
-    db:Session=Depends(get_db),
+    db:Session=Depends(get_read_db),
     current_user:User=Depends(is_admin_user),
     page:int=Query(1,ge=1),
     limit:int=Query(10,ge=1,le=100),
     search:str=Query(''),
-    filter:str=Query('all',regex='^(all|success|failed|pending)$')
+    filter:str=Query('all',regex='^(all|success|failed|pending)$'),
+    cursor:str|None=Query(None),
+    count:str=Query('exact',regex=PAGINATION_COUNT_MODES)
 ):
-    return get_withdrawals_by_status(db,page,limit,search,filter)
+    return get_withdrawals_by_status(db,page,limit,search,filter,cursor,count)
 
 @router.put('/withdraw/{withdraw_id}/status',response_model=WithdrawResponse)
 def update_withdraw_status_api( 
@@ -108,4 +137,6 @@ def update_withdraw_status_api(
     if data.status == 'failed' or data.status == 'rejected':
         db_account = get_or_create_affiliate_account(db,db_withdraw.user_id)
         re_add_withdraw_amount_affiliate_account_balance(db,db_account,db_withdraw.amount)
+    invalidate_affiliate_dashboard(db_withdraw.user_id)
+    dashboard_refresher.request_refresh()
     return db_withdraw
\ No newline at end of file
@@ -2,23 +2,26 @@ from fastapi import Depends,APIRouter,HTTPException,status,UploadFile
 from sqlalchemy.orm import Session
 from crud import coupon_code as crud_coupon 
 from schemas.coupon_code import *
-from db.session import get_db
-from schemas.common import Pagination,PaginationResponse
+from db.session import get_db,get_read_db
+from schemas.common import Pagination,PaginationResponse,PAGINATION_COUNT_MODES
 from models.user import User
 from core.deps import is_admin_user
 from fastapi import Query
+from fastapi.responses import StreamingResponse
 router = APIRouter()
 
 @router.get('/all',response_model=PaginationResponse)
-def get_coupons_code(db:Session=Depends(get_db),
+def get_coupons_code(db:Session=Depends(get_read_db),
                     current_user:User=Depends(is_admin_user),
                     page:int=Query(1,ge=1),
                     limit:int=Query(10,ge=1,le=100),
                     search:str=Query(''),
-                    filter:str=Query('all',regex='^(all|flat|percentage)$')
+                    filter:str=Query('all',regex='^(all|flat|percentage)$'),
+                    cursor:str|None=Query(None),
+                    count:str=Query('exact',regex=PAGINATION_COUNT_MODES)
                     ):
   
-  return crud_coupon.get_all_coupons(db,page,limit,search,filter)
+  return crud_coupon.get_all_coupons(db,page,limit,search,filter,cursor,count)
 
 @router.get('/{coupon_id}',response_model=CouponCodeResponse)
 def get_coupons_code(coupon_id:str,db:Session=Depends(get_db)):
@@ -33,6 +36,19 @@ def create_coupon(data:CouponCodeCreate,db:Session=Depends(get_db)):
     raise HTTPException(status_code=400,detail="Code already exist")
   return crud_coupon.create_coupon_code(db,data)
 
+@router.post('/bulk-create')
+def create_bulk_coupons(data:CouponCodeBulkCreate,db:Session=Depends(get_db),current_user:User=Depends(is_admin_user)):
+  codes = crud_coupon.create_bulk_coupon_codes(db,data)
+
+  def rows():
+    yield "code,type,discount,min_purchase,no_of_access\n"
+    rule = f"{data.type},{data.discount},{data.min_purchase if data.min_purchase is not None else ''},{data.no_of_access}"
+    for code in codes:
+      yield f"{code},{rule}\n"
+
+  filename = f"coupons_{data.prefix or 'bulk'}_{len(codes)}.csv"
+  return StreamingResponse(rows(),media_type="text/csv",headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
 @router.put('/update/{coupon_id}',response_model=CouponCodeResponse)
 def create_coupon(coupon_id:str,data:CouponCodeUpdate,db:Session=Depends(get_db)):
   db_coupon = crud_coupon.get_coupon_by_id(db,coupon_id)
@@ -51,22 +67,13 @@ def create_coupon(coupon_id:str,db:Session=Depends(get_db)):
 
 @router.post('/apply')
 def apply_coupon_code(data:CouponCodeApply,db:Session=Depends(get_db)):
-    db_coupon = crud_coupon.get_coupon_by_code(db,data.code)
-    if not db_coupon:
+    rule = crud_coupon.get_coupon_rule(db,data.code)
+    if not rule:
         raise HTTPException(status_code=400,detail="Coupon code not found")
-    if db_coupon.no_of_access <= 0:
+    discount = crud_coupon.calculate_coupon_discount(rule,data.amount)
+    if crud_coupon.get_coupon_remaining_uses(db,rule.code) <= 0:
         raise HTTPException(status_code=400,detail="Coupon code has no uses left")
-    if  db_coupon.type=='flat' and db_coupon.min_purchase and data.amount < db_coupon.min_purchase:
-        raise HTTPException(status_code=400,detail="Minimum purchase amount not met")
-    discount = 0
-    if db_coupon.type == 'percentage':
-        discount = (data.amount * db_coupon.discount) / 100
-    elif db_coupon.type == 'flat':
-        discount = db_coupon.discount
-
     return {
         "discount": discount,
-        "coupon": db_coupon.code,
+        "coupon": rule.code,
     }
-
-
@@ -2,16 +2,17 @@ from fastapi import APIRouter, UploadFile, File, Depends,HTTPException,Form
 from sqlalchemy.orm import Session
 from crud import course as crud_course 
 from schemas.course import *
-from db.session import get_db
+from db.session import get_db,get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
 from schemas.common import Pagination,PaginationResponse
-from core.deps import is_admin_user,get_current_user,get_optional_current_user
+from core.deps import is_admin_user,get_current_user,get_optional_current_user,get_optional_current_user_async
 from crud.purchase import get_purchase_by_user_id_and_item_id_and_type
 from models.user import User
 from permissions.permission import has_purchased_course
 from models.course import Course
 router = APIRouter()
 @router.get('/get/watch/{course_id}')
-async def create_course(
+def create_course(
   db:Session=Depends(get_db),
   db_course:Course = Depends(has_purchased_course),
   current_user:User = Depends(get_current_user)
@@ -34,28 +35,35 @@ async def create_course(
 
 
 
+def get_course_landing(db:Session,course_id:str,user_id:int|None):
+  db_course = crud_course.get_course_by_id(db,course_id)
+  if not db_course:
+    return None
+  res = CourseLandingResponse.from_orm(db_course)
+  if user_id and get_purchase_by_user_id_and_item_id_and_type(db,user_id,db_course.id,'course'):
+    res.is_purchased = True
+  return res
+
 @router.get('/get/landing/{course_id}',response_model=CourseLandingResponse)
 async def get_course_landing_page(  
   course_id:str,
-  db:Session=Depends(get_db) ,
-  current_user:User |None= Depends(get_optional_current_user)  
+  db:AsyncSession=Depends(get_async_db) ,
+  current_user:User |None= Depends(get_optional_current_user_async)  
 ):  
-  db_course = crud_course.get_course_by_id(db,course_id)
-  if not db_course:
+  res = await db.run_sync(get_course_landing,course_id,current_user.id if current_user else None)
+  if not res:
     raise HTTPException(status_code=404,detail="Course not found")
-  if current_user and get_purchase_by_user_id_and_item_id_and_type(db,current_user.id,db_course.id,'ebook'):
-    db_course.is_purchased = True
-  return db_course
+  return res
 
 @router.get('/list')
 async def list_courses(
-  db: Session = Depends(get_db),
+  db: AsyncSession = Depends(get_async_db),
   data: Pagination = Depends()): 
-  return crud_course.get_list_of_courses(db,data.page,data.size,data.search)
+  return await db.run_sync(crud_course.get_list_of_courses,data.page,data.size,data.search)
 
 
 @router.post('/create',response_model=CourseResponse)
-async def create_course(
+def create_course(
   db: Session = Depends(get_db),
   current_user:User = Depends(is_admin_user),
   thumbnail: UploadFile | None = File(...),
@@ -68,8 +76,8 @@ async def create_course(
   is_featured: bool = Form(False),
   is_new: bool = Form(False),
 ):
-  thumbnail_url = await crud_course.upload_thumbnail(thumbnail)
-  intro_video_url = await crud_course.upload_intro_video(intro_video)
+  thumbnail_url = crud_course.upload_thumbnail(thumbnail)
+  intro_video_url = crud_course.upload_intro_video(intro_video)
   data = {
     "title": title,
     "description": description,
@@ -86,7 +94,7 @@ async def create_course(
   return course
 
 @router.put('/update/{course_id}',response_model=CourseResponse)
-async def update_course(
+def update_course(
   course_id:str,
   db: Session = Depends(get_db),
   thumbnail: UploadFile | None = File(None),
@@ -112,9 +120,9 @@ async def update_course(
   if not db_course:
     raise HTTPException(status_code=404,detail="Course not found")
   if thumbnail:
-    thumbnail_url = await crud_course.update_thumbnail_file(thumbnail,db_course)
+    thumbnail_url = crud_course.update_thumbnail_file(thumbnail,db_course)
   if intro_video:
-    intro_video_url = await crud_course.update_into_video_file(intro_video,db_course)
+    intro_video_url = crud_course.update_into_video_file(intro_video,db_course)
   
   
   update_data = {
@@ -134,7 +142,7 @@ async def update_course(
   if not db_landing_page:
     db_landing_page = crud_course.create_landing_page(db,course.id)
   if landing_thumbnail and db_landing_page:
-    landing_thumbnail_url = await crud_course.update_landing_thumbnail_file(landing_thumbnail,db_landing_page)
+    landing_thumbnail_url = crud_course.update_landing_thumbnail_file(landing_thumbnail,db_landing_page)
   update_data = {
     "main_heading": main_heading if main_heading is not None  else db_landing_page.main_heading ,
     "sub_heading": sub_heading if sub_heading is not None  else db_landing_page.sub_heading ,
@@ -147,15 +155,15 @@ async def update_course(
   return course
 
 @router.delete('/delete/{course_id}')
-async def update_course(course_id:str,db: Session = Depends(get_db)):
+def update_course(course_id:str,db: Session = Depends(get_db)):
   db_course = crud_course.get_course_by_id(db,course_id,is_admin=True)
   if not db_course: 
     raise HTTPException(status_code=404,detail="Course not found")
-  await crud_course.delete_course_files(db_course)
+  crud_course.delete_course_files(db_course)
   return crud_course.delete_course(db,db_course)
 
 @router.post('/chapter/create',response_model=CourseChapterResponse)
-async def create_course_chapter(
+def create_course_chapter(
   db: Session = Depends(get_db),
   video: UploadFile = File(...),
   course_id: int = Form(...),
@@ -166,7 +174,7 @@ async def create_course_chapter(
   db_course = crud_course.get_course_by_id(db,course_id,is_admin=True)
   if not db_course:
     raise HTTPException(status_code=404,detail="Course not found")
-  video_url = await crud_course.upload_video(video)
+  video_url = crud_course.upload_video(video)
   data = {
     "title": title,
     "description": description,
@@ -178,7 +186,7 @@ async def create_course_chapter(
   return course_chapter
 
 @router.put('/chapter/update/{course_chapter_id}',response_model=CourseChapterResponse)
-async def update_course_chapter(
+def update_course_chapter(
   course_chapter_id:str,
   db: Session = Depends(get_db),
   video: UploadFile | None = File(None),
@@ -192,8 +200,8 @@ async def update_course_chapter(
   if not db_course_chapter:
     raise HTTPException(status_code=404,detail="Course chapter not found")
   print(video,pdf)  
-  video_url = await crud_course.update_video_file(video,db_course_chapter)
-  pdf_url = await crud_course.update_pdf_file(pdf,db_course_chapter)
+  video_url = crud_course.update_video_file(video,db_course_chapter)
+  pdf_url = crud_course.update_pdf_file(pdf,db_course_chapter)
   update_data = {
     "title": title if title is not None else db_course_chapter.title,
     "description": description if description is not None else db_course_chapter.description,
@@ -204,17 +212,17 @@ async def update_course_chapter(
   return crud_course.update_course_chapter(db,db_course_chapter,update_data)
 
 @router.delete('/chapter/delete/{course_chapter_id}')
-async def update_course(course_chapter_id:str,db: Session = Depends(get_db)):
+def update_course(course_chapter_id:str,db: Session = Depends(get_db)):
   db_course_chapter = crud_course.get_course_chapter_by_id(db,course_chapter_id)
   if not db_course_chapter:
     raise HTTPException(status_code=404,detail="Course chapter not found")
 
-  await crud_course.delete_file(db_course_chapter.video)
-  await crud_course.delete_file(db_course_chapter.pdf)
+  crud_course.delete_file(db_course_chapter.video)
+  crud_course.delete_file(db_course_chapter.pdf)
   return crud_course.delete_course_chapter(db,db_course_chapter)
 
 @router.post('/chapter/complete/{course_chapter_id}')
-async def complete_chapter(
+def complete_chapter(
   course_chapter_id:int,  
   db:Session=Depends(get_db),
   current_user:User = Depends(get_current_user)
@@ -2,9 +2,10 @@ from fastapi import APIRouter, UploadFile, File, Depends,HTTPException,Form
 from sqlalchemy.orm import Session
 from crud import ebook as crud_ebook 
 from schemas.ebook import *
-from db.session import get_db
+from db.session import get_db,get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.user import User
-from core.deps import is_admin_user,get_optional_current_user
+from core.deps import is_admin_user,get_optional_current_user,get_optional_current_user_async
 from schemas.common import Pagination,PaginationResponse
 from crud.purchase import get_purchase_by_user_id_and_item_id_and_type
 from permissions.permission import has_purchased_ebook
@@ -12,7 +13,7 @@ from models.ebook import EBook
 router = APIRouter()
 
 @router.get('/get/{ebook_id}',response_model=EBookResponse)
-async def create_ebook(
+def create_ebook(
   ebook_id:str,
   db:Session=Depends(get_db)
 ):
@@ -23,42 +24,49 @@ async def create_ebook(
   return db_ebook
 
 @router.get('/get/read/{ebook_id}',response_model=EBookResponse)
-async def create_ebook(
+def create_ebook(
   ebook_id:str,
   db:Session=Depends(get_db),
   db_ebook:EBook = Depends(has_purchased_ebook)
 ):
   return db_ebook
 
+def get_ebook_landing(db:Session,ebook_id:str,user_id:int|None):
+  db_ebook = crud_ebook.get_ebook_by_id(db,ebook_id)
+  if not db_ebook:
+    return None
+  res = EbookLandingResponse.from_orm(db_ebook)
+  if user_id and get_purchase_by_user_id_and_item_id_and_type(db,user_id,ebook_id,'ebook'):
+    res.is_purchased = True
+  return res
+
 @router.get('/get/landing/{ebook_id}',response_model=EbookLandingResponse)
 async def get_ebook_landing_page(  
   ebook_id:str,
-  db:Session=Depends(get_db),
-  current_user:User |None= Depends(get_optional_current_user)
+  db:AsyncSession=Depends(get_async_db),
+  current_user:User |None= Depends(get_optional_current_user_async)
 ): 
-  db_ebook = crud_ebook.get_ebook_by_id(db,ebook_id)
-  if not db_ebook:
+  res = await db.run_sync(get_ebook_landing,ebook_id,current_user.id if current_user else None)
+  if not res:
     raise HTTPException(status_code=404,detail="Ebook not found")
-  if current_user and get_purchase_by_user_id_and_item_id_and_type(db,current_user.id,ebook_id,'ebook'):
-    db_ebook.is_purchased = True
-  return db_ebook
+  return res
 
 @router.get('/list')
 async def list_ebooks(
-  db: Session = Depends(get_db),
+  db: AsyncSession = Depends(get_async_db),
   data: Pagination = Depends(),
 ): 
-  return crud_ebook.get_list_of_ebooks(db,data.page,data.size,data.search)
+  return await db.run_sync(crud_ebook.get_list_of_ebooks,data.page,data.size,data.search)
 @router.get('/admin/list')
 async def list_ebooks(
-  db: Session = Depends(get_db),
+  db: AsyncSession = Depends(get_async_db),
   data: Pagination = Depends(),
 ): 
   
-  return crud_ebook.get_list_of_ebooks(db,data.page,data.size,data.search)
+  return await db.run_sync(crud_ebook.get_list_of_ebooks,data.page,data.size,data.search)
 
 @router.post('/create',response_model=EBookResponse)
-async def create_ebook(
+def create_ebook(
   db: Session = Depends(get_db),
   current_user: User = Depends(is_admin_user),
   thumbnail: UploadFile = File(...),
@@ -71,8 +79,8 @@ async def create_ebook(
   is_featured: bool = Form(False),
   is_new: bool = Form(False),
 ):
-  thumbnail_url = await crud_ebook.upload_thumbnail(thumbnail)
-  pdf_url = await crud_ebook.upload_pdf_file(pdf)
+  thumbnail_url = crud_ebook.upload_thumbnail(thumbnail)
+  pdf_url = crud_ebook.upload_pdf_file(pdf)
   data = {
     "title": title,
     "description": description,
@@ -89,7 +97,7 @@ async def create_ebook(
   return ebook
 
 @router.put('/update/{ebook_id}',response_model=EBookResponse)
-async def update_ebook(
+def update_ebook(
   ebook_id:str,
   current_user: User = Depends(is_admin_user),
   db: Session = Depends(get_db),
@@ -114,11 +122,11 @@ async def update_ebook(
   if not db_ebook:
     raise HTTPException(status_code=404,detail="ebook not found")
   if thumbnail :
-    thumbnail_url = await crud_ebook.update_thumbnail_file(thumbnail,db_ebook)
+    thumbnail_url = crud_ebook.update_thumbnail_file(thumbnail,db_ebook)
   if intro_video:
-    intro_video_url = await crud_ebook.update_intro_video_file(intro_video,db_ebook)
+    intro_video_url = crud_ebook.update_intro_video_file(intro_video,db_ebook)
   if pdf:
-    pdf_url = await crud_ebook.update_pdf_file(pdf,db_ebook)
+    pdf_url = crud_ebook.update_pdf_file(pdf,db_ebook)
   update_data = {
     "title": title if title is not None else db_ebook.title,
     "description": description if description is not None else db_ebook.description,
@@ -138,7 +146,7 @@ async def update_ebook(
   if not db_landing_page:
     db_landing_page = crud_ebook.create_ebook_landing_page(db, ebook_id)
   if landing_thumbnail:
-    landing_thumbnail_url = await crud_ebook.update_landing_thumbnail_file(landing_thumbnail,db_landing_page)
+    landing_thumbnail_url = crud_ebook.update_landing_thumbnail_file(landing_thumbnail,db_landing_page)
   update_data = {
     "main_heading": main_heading if main_heading is not None else db_landing_page.main_heading,
     "sub_heading": sub_heading if sub_heading is not None else db_landing_page.sub_heading,
@@ -151,15 +159,15 @@ async def update_ebook(
   return ebook
 
 @router.delete('/delete/{ebook_id}')
-async def delete_ebook(ebook_id:str,db: Session = Depends(get_db)):
+def delete_ebook(ebook_id:str,db: Session = Depends(get_db)):
   db_course = crud_ebook.get_ebook_by_id(db,ebook_id,is_admin=True)
   if not db_course:
     raise HTTPException(status_code=404,detail="EBook not found")
-  await crud_ebook.delete_ebook_files(db_course)
+  crud_ebook.delete_ebook_files(db_course)
   return crud_ebook.delete_ebook(db,db_course)
 
 @router.post('/chapter/create', response_model=EBookChapterResponse)
-async def create_ebook_chapter(
+def create_ebook_chapter(
     data:EBookChapterCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(is_admin_user)
@@ -174,7 +182,7 @@ async def create_ebook_chapter(
     return chapter
 
 @router.put('/chapter/update/{chapter_id}', response_model=EBookChapterResponse)  
-async def update_ebook_chapter(
+def update_ebook_chapter(
     chapter_id: int,
     data: EBookChapterUpdate,
     db: Session = Depends(get_db),
@@ -188,7 +196,7 @@ async def update_ebook_chapter(
     return updated_chapter
 
 @router.delete('/chapter/delete/{chapter_id}')
-async def delete_ebook_chapter( 
+def delete_ebook_chapter( 
     chapter_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(is_admin_user)
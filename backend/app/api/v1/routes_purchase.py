@@ -1,8 +1,11 @@
 from fastapi import HTTPException,APIRouter,status,Depends,Request,Query
-from db.session import get_db
+from db.session import get_db,get_read_db
 from sqlalchemy.orm import Session
 from schemas.purchase import PaymentRequest
 from core.gateway import client
+from core.cashfree import cashfree_client,CashfreeError
+from fastapi.concurrency import run_in_threadpool
+from core.hashing import hash_password_async
 from crud.auth import get_user_by_email
 from crud.auth import *
 from crud.purchase import *
@@ -10,24 +13,28 @@ from crud.course import get_course_by_id
 from crud.ebook import get_ebook_by_id
 from schemas.purchase import CheckoutResponse,AffiliateUser
 from crud.auth import get_user_by_user_id,create_affiliate_account
-from crud.coupon_code import get_coupon_by_code
+from crud.coupon_code import get_coupon_rule,calculate_coupon_discount,reserve_coupon_use,release_coupon_use
 from schemas.purchase import PurchaseVerifyRequest,PurchaseCreateRequest,PurchaseResponse
 from crud.affiliate import *
-from schemas.common import PaginationResponse
+from schemas.common import PaginationResponse,PAGINATION_COUNT_MODES
 from core.deps import is_admin_user
-from crud.user_dashboard import get_item_by_id_and_type
+from crud.user_dashboard import get_item_by_id_and_type,invalidate_affiliate_dashboard
+from lib.dashboard_refresher import dashboard_refresher
+from lib.webhook_worker import webhook_workers
+from crud.webhook import create_webhook_event,razorpay_idempotency_key,cashfree_idempotency_key,get_webhook_events,get_webhook_event_by_id,requeue_webhook_event
+from schemas.purchase import WebhookEventResponse
+from crud.utils import to_pagination_response
 import random
+import anyio
 from core.config import settings
-import httpx, os
 import uuid
-from pprint import pprint
-import traceback
+from datetime import datetime, timedelta, timezone
 router = APIRouter()
 
-@router.post('/checkout')
-def purchase_course(data: PaymentRequest,db:Session=Depends(get_db)):
+def _prepare_checkout(db: Session, data: PaymentRequest, password_hash: str | None = None, reservation: dict | None = None):
     # get the course or ebook by id
     db_item = None
+    affiliate_user = None
     if data.affiliate_user_id:
         affiliate_user = get_user_by_user_id(db,data.affiliate_user_id)
         if not affiliate_user:
@@ -41,23 +48,14 @@ def purchase_course(data: PaymentRequest,db:Session=Depends(get_db)):
         if not db_item:
             raise HTTPException(detail="EBook not found",status_code=404)
 
-    # Verify coupon
+    # Verify coupon; rules come from the in-memory index, uses are reserved below
     discount = 0
     db_coupon = None
     if data.coupon:
-        db_coupon = get_coupon_by_code(db,data.coupon)
+        db_coupon = get_coupon_rule(db,data.coupon)
         if not db_coupon:
             raise HTTPException(status_code=400,detail="Coupon code not found")
-        if db_coupon.no_of_access <= 0:
-            raise HTTPException(status_code=400,detail="Coupon code has no uses left")
-        if  db_coupon.type=='fixed' and db_coupon.min_purchase and db_item.price < db_coupon.min_purchase:
-            raise HTTPException(status_code=400,detail="Minimum purchase amount not met")
-        if db_coupon.type == 'percentage':
-            discount = (db_item.price * db_coupon.discount) / 100
-        elif db_coupon.type == 'flat':
-            discount = db_coupon.discount
-    else :
-        discount = 0
+        discount = calculate_coupon_discount(db_coupon,db_item.price)
 
     if data.user_id:
         user = get_user_by_user_id(db,data.user_id)
@@ -68,53 +66,73 @@ def purchase_course(data: PaymentRequest,db:Session=Depends(get_db)):
         if existing_user:
             raise HTTPException(detail="User with this email already exist",status_code=400)
         user =  get_temp_user_by_email(db,data.email)
+        temp_user_data = {'email':data.email,"password":password_hash,"phone":data.phone,"name":data.name}
         if user:
-            user = update_temp_user(db,user,{'email':data.email,"password":data.password,"phone":data.phone,"name":data.name})
+            user = update_temp_user(db,user,temp_user_data,is_hashed_pw=True)
         else:
-            user = create_temp_user(db,{'email':data.email,"password":data.password,"phone":data.phone,"name":data.name})
-    user_id = user.id
-    order_id = f"order_{uuid.uuid4().hex[:24]}"
+            user = create_temp_user(db,temp_user_data,is_hashed_pw=True)
+    # Hold one use of the coupon until the payment settles or the checkout expires
+    if db_coupon:
+        if not reserve_coupon_use(db,db_coupon.code):
+            raise HTTPException(status_code=400,detail="Coupon code has no uses left")
+        # Recorded here so the caller can release it even if its await is cancelled
+        if reservation is not None:
+            reservation['code'] = db_coupon.code
+    return db_item, discount, db_coupon, affiliate_user, user.id
+
+def _release_reservation(db: Session, code: str):
+    db.rollback()
+    release_coupon_use(db, code)
+
+@router.post('/checkout')
+async def purchase_course(data: PaymentRequest,db:Session=Depends(get_db)):
+    # Database work runs in the threadpool; bcrypt and the gateway call are awaited
+    password_hash = None if data.user_id else await hash_password_async(data.password)
+    reservation = {}
+    try:
+        db_item, discount, db_coupon, affiliate_user, user_id = await run_in_threadpool(_prepare_checkout, db, data, password_hash, reservation)
+        order_id = f"order_{uuid.uuid4().hex[:24]}"
 
-    payload = {
-        "order_id": order_id,
-        "order_amount": db_item.price - discount,
-        "order_currency": "INR",
-        "customer_details": {
-            "customer_id": str(user_id),
-            "customer_email": data.email,
-            "customer_phone": data.phone,
-            "customer_name": data.name,
+        payload = {
+            "order_id": order_id,
+            "order_amount": db_item.price - discount,
+            "order_currency": "INR",
+            # Unpaid orders expire together with their coupon reservation
+            "order_expiry_time": (datetime.now(timezone.utc) + timedelta(minutes=settings.COUPON_RESERVATION_TTL_MINUTES)).isoformat(),
+            "customer_details": {
+                "customer_id": str(user_id),
+                "customer_email": data.email,
+                "customer_phone": data.phone,
+                "customer_name": data.name,
+            }
         }
-    }
-    headers = {
-        "x-client-id": settings.CASHFREE_APP_ID_TEST if not settings.PRODUCTION else settings.CASHFREE_APP_ID_PROD,
-        "x-client-secret": settings.CASHFREE_SECRET_KEY_TEST if not settings.PRODUCTION else settings.CASHFREE_SECRET_KEY_PROD,
-        "x-api-version": "2022-09-01",
-        "Content-Type": "application/json"
-    }
-    base_url = settings.CASHFREE_TEST_BASE_URL if not settings.PRODUCTION else settings.CASHFREE_PROD_BASE_URL
-    print(headers,base_url)
-    response = httpx.post(f"{base_url}/orders", headers=headers, json=payload)
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail=response.text)
+        try:
+            response_data = await cashfree_client.create_order(payload)
+        except CashfreeError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        payment_session_id = response_data["payment_session_id"]
+        order_id = response_data["order_id"]
 
-    response_data = response.json()
-    pprint(response_data)
-    payment_session_id = response_data["payment_session_id"]
-    order_id = response_data["order_id"]
-    create_transaction_processing(db, {
-        "transaction_id": order_id,
-        "item_id": data.item_id,
-        "item_type": data.item_type,
-        "affiliate_user_id":affiliate_user.id if data.affiliate_user_id else None,
-        "user_id": user_id,
-        "is_new_user": data.user_id is None,
-        "amount": db_item.price,
-        "discount": discount,
-        "coupon_code": data.coupon,
-        "coupon_type": 'fixed' if db_coupon and db_coupon.type == 'fixed' else 'percentage'
-    })
-    print({"payment_session_id": payment_session_id, "transaction_id": order_id})
+        await run_in_threadpool(create_transaction_processing, db, {
+            "transaction_id": order_id,
+            "item_id": data.item_id,
+            "item_type": data.item_type,
+            "affiliate_user_id":affiliate_user.id if affiliate_user else None,
+            "user_id": user_id,
+            "is_new_user": data.user_id is None,
+            "amount": db_item.price,
+            "discount": discount,
+            "coupon_code": data.coupon,
+            "coupon_type": 'fixed' if db_coupon and db_coupon.type == 'fixed' else 'percentage',
+            "coupon_reserved": db_coupon is not None,
+        })
+    except BaseException:
+        # Until the processing row exists the sweeper cannot see the reservation,
+        # so any failure (gateway, bad response, cancellation) releases it here
+        if reservation.get('code'):
+            with anyio.CancelScope(shield=True):
+                await run_in_threadpool(_release_reservation, db, reservation['code'])
+        raise
     return {"payment_session_id": payment_session_id, "transaction_id": order_id}
 
 # create order
@@ -148,180 +166,46 @@ async def payment_webhook(request: Request, db: Session = Depends(get_db)):
     if not verify_razorpay_signature(payload, received_signature, secret):
         return {"status": "unauthorized"}, 401
 
+    # Only record the event here; fulfillment runs in the webhook workers
     data = await request.json()
-    event = data.get("event")
-    payment_entity = data["payload"]["payment"]["entity"]
-    order_id = payment_entity.get("order_id")
-
-    db_transaction_processing = get_transaction_processing_by_id(db, order_id)
-    temp_user = None
-    purchase = None
-    
-    try:
-        affiliate_account = None
-        new_user_affiliate_account = None
-        db_affiliate_link_purchase = None
-        if event == "payment.captured" and db_transaction_processing:
-            if db_transaction_processing.is_new_user:
-                temp_user = get_temp_user_by_id(db, db_transaction_processing.user_id)
-                user = create_user(
-                    db,
-                    UserCreate(
-                        email=temp_user.email,
-                        password=temp_user.password,
-                        name=temp_user.name,
-                        phone=temp_user.phone
-                    ),
-                    is_hashed_pw=True)
-                new_user_affiliate_account = create_affiliate_account(db, user.id)
-                db_transaction_processing.user_id = user.id
-            if db_transaction_processing.affiliate_user_id:
-                affiliate_account = get_affiliate_account_by_user_id(db, db_transaction_processing.affiliate_user_id)
-                db_item = get_item_by_id_and_type(db, db_transaction_processing.item_id, db_transaction_processing.item_type)
-                if affiliate_account:
-                    affiliate_account = add_purchase_commission_to_affiliate_account(db,affiliate_account,db_item.commission,commit=False)
-
-                db_affiliate_link = get_affiliate_link_by_all(db,db_transaction_processing.affiliate_user_id,db_transaction_processing.item_id, db_transaction_processing.item_type)
-                db_affiliate_link_purchase = add_purchase_to_affiliate_link(db,db_affiliate_link,db_item.commission,commit=False)
-            # Create purchase
-            purchase = create_purchase(db, db_transaction_processing, commit=False)
-            # Delete transaction processing and temp user
-            db.delete(db_transaction_processing)
-            if temp_user:
-                db.delete(temp_user)
-        # Create transaction for all types of events
-        transaction = create_razorpay_transaction(
-            db=db,
-            transaction_id=payment_entity['id'],
-            db_purchase=purchase,
-            txn_data=payment_entity,
-            commit=False
-        )
-        # add commission to affiliate user account if applicable
-        
-        db.commit()
-        if purchase:
-            db.refresh(purchase)
-        if affiliate_account:   
-            db.refresh(affiliate_account)
-        if new_user_affiliate_account:
-            db.refresh(new_user_affiliate_account)
-        if db_affiliate_link_purchase:
-            db.refresh(db_affiliate_link_purchase)
-        
-        return {
-            "payment_status": event,
-            "transaction_id": transaction.id
-        }
-
-    except Exception as e:
-        print(f"Error processing webhook: {e}")
-        db.rollback()
-        if user:
-            db.delete(user)
-        if purchase:
-            db.delete(purchase)
-        return {"payment_status": "error", "detail": str(e)}
+    idempotency_key = razorpay_idempotency_key(request.headers, data)
+    event_id = await run_in_threadpool(create_webhook_event, db, 'razorpay', data, data.get("event"), idempotency_key)
+    if event_id is None:
+        return {"status": "duplicate"}
+    webhook_workers.notify()
+    return {"status": "received", "event_id": event_id}
 
 
 @router.post("/cashfree-webhook")
 async def cashfree_webhook(request: Request, db: Session = Depends(get_db)):
-    try:
-        data = await request.json()
-        event = data.get("type")  # 'type' instead of 'event' in Cashfree
-        order_data = data.get("data", {}).get("order", {})
-        payment_info = data.get("data", {}).get("payment", {})
-        customer_info =  data.get("data", {}).get("customer_details", {})
-        order_id = order_data.get("order_id")
-        payment_status = payment_info.get("payment_status")
-        db_transaction_processing = get_transaction_processing_by_id(db, order_id)
-        purchase = None
-        user = None
-        affiliate_account = None
-        new_user_affiliate_account = None
-        db_affiliate_link_purchase = None
-        db_transaction = None
-        temp_user = None
-        if not db_transaction_processing: return  {"payment_status": "error", "detail": "Transaction processing not found"}
-        db_item = get_item_by_id_and_type(db, db_transaction_processing.item_id, db_transaction_processing.item_type)
-        if payment_status == "SUCCESS":
-            # Handle new user
-            if db_transaction_processing.is_new_user:
-                temp_user = get_temp_user_by_id(db, db_transaction_processing.user_id)
-                user = create_user(
-                    db,
-                    UserCreate(
-                        email=temp_user.email,
-                        password=temp_user.password,
-                        name=temp_user.name,
-                        phone=temp_user.phone
-                    ),
-                    is_hashed_pw=True)
-                new_user_affiliate_account = create_affiliate_account(db, user.id)
-                db_transaction_processing.user_id = user.id
+    data = await request.json()
+    idempotency_key = cashfree_idempotency_key(data)
+    event_id = await run_in_threadpool(create_webhook_event, db, 'cashfree', data, data.get("type"), idempotency_key)
+    if event_id is None:
+        return {"status": "duplicate"}
+    webhook_workers.notify()
+    return {"status": "received", "event_id": event_id}
 
-            if db_transaction_processing.affiliate_user_id:
-                affiliate_account = get_affiliate_account_by_user_id(db, db_transaction_processing.affiliate_user_id)
-                if affiliate_account:
-                    affiliate_account = add_purchase_commission_to_affiliate_account(db,affiliate_account,db_item.commission,commit=False)
 
-                db_affiliate_link = get_affiliate_link_by_all(db,db_transaction_processing.affiliate_user_id,db_transaction_processing.item_id, db_transaction_processing.item_type)
-                db_affiliate_link_purchase = add_purchase_to_affiliate_link(db,db_affiliate_link,db_item.commission,commit=False)
-                
-            # Create purchase
-            purchase = create_purchase(db, db_transaction_processing, commit=False)
-            
-            db.delete(db_transaction_processing)
-            if temp_user:
-                print('deleting temp user',temp_user)
-                db.delete(temp_user)
-        
-        db_transaction = get_transaction_by_transaction_id(db, order_id)
-        if not db_transaction:
-            db_transaction = create_cashfree_transaction(
-                    db=db,
-                    transaction_id=order_id,
-                    txn_data=payment_info,
-                    customer_info=customer_info,
-                    provider="cashfree",
-                    item_id=db_transaction_processing.item_id,
-                    item_type=db_transaction_processing.item_type,
-                    commit=False
-                )
-            db.add(db_transaction)
-        else:
-            db_transaction = get_transaction_by_transaction_id(db, order_id)
-            if db_transaction:
-                update_cashfree_transaction(db,db_transaction, payment_info, 'cashfree',commit=False)
-        db.commit()
-        if purchase:
-            purchase.transaction_id = db_transaction.id if db_transaction else None
-            print('added transaction Id',db_transaction,db_transaction.id)
-            db.add(purchase)
-        db.commit()
-        if affiliate_account:   
-            db.refresh(affiliate_account)
-        if new_user_affiliate_account:
-            db.refresh(new_user_affiliate_account)
-        if db_affiliate_link_purchase:
-            db.refresh(db_affiliate_link_purchase)
-        if db_transaction:
-            db.refresh(db_transaction)
-        if purchase:
-            db.refresh(purchase)
-        return {
-            "payment_status": event,
-            "transaction_id": order_id
-        }
+@router.get("/webhook-events",response_model=PaginationResponse)
+def get_webhook_event_list(db:Session=Depends(get_db),current_user:User=Depends(is_admin_user),
+                            page:int=Query(1),
+                            limit:int=Query(10),
+                            status:str=Query(''),
+                            ):
+    return to_pagination_response(get_webhook_events(db,status),WebhookEventResponse,page,limit)
 
-    except Exception as e:
-        traceback.print_exc()
-        print(f"Error processing Cashfree webhook: {e}")
-        db.rollback()
-        if user:
-            db.delete(user)
-            db.commit() 
-        return {"payment_status": "error", "detail": str(e)}
+
+@router.post("/webhook-events/{event_id}/retry",response_model=WebhookEventResponse)
+def retry_webhook_event(event_id:int,db:Session=Depends(get_db),current_user:User=Depends(is_admin_user)):
+    db_event = get_webhook_event_by_id(db,event_id)
+    if not db_event:
+        raise HTTPException(status_code=404,detail="Webhook event not found")
+    if db_event.status not in ['dead','pending']:
+        raise HTTPException(status_code=400,detail=f"Webhook event is {db_event.status}")
+    db_event = requeue_webhook_event(db,db_event)
+    webhook_workers.notify()
+    return db_event
 
 
 @router.get('/checkout/{type}/{item_id}')
@@ -368,41 +252,39 @@ def verify_transaction(data: PurchaseVerifyRequest, db: Session = Depends(get_db
 
 
 @router.get("/transactions",response_model=PaginationResponse)
-def get_transaction_history(db:Session=Depends(get_db),current_user:User=Depends(is_admin_user),
+def get_transaction_history(db:Session=Depends(get_read_db),current_user:User=Depends(is_admin_user),
                             page:int=Query(1),
                             limit:int=Query(10),
                             filter:str=Query(''),
                             search:str=Query(''),
+                            cursor:str|None=Query(None),
+                            count:str=Query('exact',regex=PAGINATION_COUNT_MODES),
                             ):
     if filter == "all":
-        return get_all_transactions(db,page,limit,search)
+        return get_all_transactions(db,page,limit,search,cursor,count)
     elif filter == "success":
-        return get_success_transactions(db,page,limit,search)
+        return get_success_transactions(db,page,limit,search,cursor,count)
     elif filter == "failed":
-        return get_failed_transactions(db,page,limit,search)
+        return get_failed_transactions(db,page,limit,search,cursor,count)
 
 
 @router.get("/purchases")
-def get_transaction_history(db:Session=Depends(get_db),current_user:User=Depends(is_admin_user),
+def get_transaction_history(db:Session=Depends(get_read_db),current_user:User=Depends(is_admin_user),
                             page:int=Query(1),
                             limit:int=Query(10),
                             filter:str=Query(''),
                             search:str=Query(''),
+                            cursor:str|None=Query(None),
+                            count:str=Query('exact',regex=PAGINATION_COUNT_MODES),
                             ):
-    print(db.query(Purchase).filter(
-        Purchase.purchased_user_id == 15,
-        Purchase.item_id == 7,
-        Purchase.item_type == 'ebook',
-        Purchase.affiliate_user_id == None,
-    ).first())
     if filter == "all":
-        return get_all_purchases(db,page,limit,search)
+        return get_all_purchases(db,page,limit,search,cursor,count)
     elif filter == "ebook":
-        return get_all_ebook_purchases(db,page,limit,search)
+        return get_all_ebook_purchases(db,page,limit,search,cursor,count)
     elif filter == "course":
-        return get_all_course_purchases(db,page,limit,search)
+        return get_all_course_purchases(db,page,limit,search,cursor,count)
     else:
-        return get_all_dummy_purchases(db,page,limit,search)
+        return get_all_dummy_purchases(db,page,limit,search,cursor,count)
 @router.post("/create")
 def create_purchase_from_admin(data:PurchaseCreateRequest,db:Session=Depends(get_db),current_user:User=Depends(is_admin_user)):
     #verify user and items first
@@ -457,6 +339,9 @@ def create_purchase_from_admin(data:PurchaseCreateRequest,db:Session=Depends(get
     if not exist_purchase:
         db.add(db_purchase)
     db.commit()
+    if affiliate_user:
+        invalidate_affiliate_dashboard(affiliate_user.id)
+    dashboard_refresher.request_refresh()
     db.refresh(db_purchase)
     if affiliate_account:
         db.refresh(affiliate_account)
@@ -1,45 +1,50 @@
-from fastapi import APIRouter,Depends,HTTPException
+from fastapi import APIRouter,Depends,HTTPException,Query
 from sqlalchemy.orm import Session
 from schemas.user import *
 from crud import auth as crud_auth
 from core.security import create_access_token
-from core.deps import get_current_user,is_admin_user
+from core.deps import get_current_user,is_admin_user,get_current_user_async,is_admin_user_async
 from models.user import User
-from db.session import get_db
+from db.session import get_db,get_read_db,get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from schemas.common import PAGINATION_COUNT_MODES
 from crud.utils import send_reset_email,get_frontend_url
 from core.security import  create_password_reset_token,verify_password_reset_token
+from core.hashing import hash_password_async
+from fastapi.concurrency import run_in_threadpool
 router = APIRouter()
 
 @router.post('/register',response_model=UserResponse)
-def register(user_in:UserCreate,db:Session=Depends(get_db)):
-  existing_user = crud_auth.get_user_by_email(db,user_in.email)
+async def register(user_in:UserCreate,db:Session=Depends(get_db)):
+  existing_user = await run_in_threadpool(crud_auth.get_user_by_email,db,user_in.email)
   if existing_user:
     raise HTTPException(status_code=400,detail="Email Already Exist")
-  db_user = crud_auth.create_user(db,user_in)
-  crud_auth.create_affiliate_account(db,db_user.id)
-  return db_user
+  hashed_pw = await hash_password_async(user_in.password)
+  db_user = await run_in_threadpool(crud_auth.register_user,db,user_in.copy(update={'password':hashed_pw}))
+  return UserResponse.from_orm(db_user)
 
 @router.post('/login',response_model=LoginResponse)
-def login(request:LoginRequest,db:Session=Depends(get_db)):
-  user = crud_auth.get_user_by_email(db,request.email)
-  if not user or not crud_auth.verify_password(request.password,user.password):
+async def login(request:LoginRequest,db:Session=Depends(get_db)):
+  user = await crud_auth.authenticate_user(db,request.email,request.password)
+  if not user:
     raise HTTPException(status_code=400,detail="Invalid credentials")
   token = create_access_token(data={'sub':user.email})
   return {'token':token,'user':UserResponse.from_orm(user)} 
 
 @router.get('/me',response_model=UserResponse)
-def verify_user(current_user:User=Depends(get_current_user)):
+async def verify_user(current_user:User=Depends(get_current_user_async),db:AsyncSession=Depends(get_async_db)):
   """For verify the user"""
-  return current_user
+  return await db.run_sync(lambda sync_db: UserResponse.from_orm(current_user.load(sync_db)))
 
 @router.get('/admin/me',response_model=UserResponse)
-def verify_user(current_user:User=Depends(is_admin_user)):
-  return current_user
+async def verify_user(current_user:User=Depends(is_admin_user_async),db:AsyncSession=Depends(get_async_db)):
+  return await db.run_sync(lambda sync_db: UserResponse.from_orm(current_user.load(sync_db)))
 
 @router.get('/all')
-def get_all_user(db:Session=Depends(get_db),current_user:User=Depends(is_admin_user),
-    page:int=1,limit:int=10,search:str=''):
-  return crud_auth.get_all_users(db,page,limit,search)
+def get_all_user(db:Session=Depends(get_read_db),current_user:User=Depends(is_admin_user),
+    page:int=1,limit:int=10,search:str='',
+    cursor:str|None=Query(None),count:str=Query('exact',regex=PAGINATION_COUNT_MODES)):
+  return crud_auth.get_all_users(db,page,limit,search,cursor,count)
 
 @router.put('/update/password/{user_id}',response_model=UserResponse)
 def update_password(user_id:str,data:UpdatePassword,db:Session=Depends(get_db),current_user:User=Depends(is_admin_user)):
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException,Query
 from sqlalchemy.orm import Session
-from core.deps import get_current_user
-from db.session import get_db
+from core.deps import get_current_user,get_current_user_async
+from db.session import get_db,get_async_db,get_read_db
+from sqlalchemy.ext.asyncio import AsyncSession
 from crud.user_dashboard import *
 from crud.affiliate import *
 from fastapi import Query
@@ -14,13 +15,14 @@ from schemas.user import UserResponse
 from schemas.course import CourseResponse   
 from schemas.ebook import EBookResponse
 from sqlalchemy import or_
+from crud.search import apply_search
 import math
 
 
 router = APIRouter()
 
 @router.get('/list')
-def get_user_dashboard_home_data(db: Session = Depends(get_db),current_user=Depends(get_current_user),
+def get_user_dashboard_home_data(db: Session = Depends(get_read_db),current_user=Depends(get_current_user),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
     filter: str = Query('all', regex='^(all|courses|ebooks)$')
@@ -34,17 +36,12 @@ def get_user_dashboard_home_data(db: Session = Depends(get_db),current_user=Depe
     return []
 
 @router.get('/card')
-def get_user_dashboard_home_card(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    return {
-        "total_purchase":get_total_user_purchases(current_user),
-        "total_progressing_course":get_total_progressing_courses(db,current_user),
-        "total_ebooks":get_total_purchased_ebooks(current_user),
-        "total_courses":get_total_purchased_courses(current_user),
-    }
+async def get_user_dashboard_home_card(db: AsyncSession = Depends(get_async_db), current_user=Depends(get_current_user_async)):
+    return await db.run_sync(get_home_card,current_user)
 
 @router.get('/courses')
 def get_user_dashboard_courses(
-    db: Session = Depends(get_db), 
+    db: Session = Depends(get_read_db), 
     current_user=Depends(get_current_user),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
@@ -63,7 +60,7 @@ def get_user_dashboard_courses(
 
 @router.get('/ebooks')
 def get_user_dashboard_ebooks(
-    db: Session = Depends(get_db), 
+    db: Session = Depends(get_read_db), 
     current_user=Depends(get_current_user),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
@@ -81,31 +78,12 @@ def get_user_dashboard_ebooks(
     return []   
 
 @router.get('/affiliate-dashboard')
-def get_affiliate_dashboard(db:Session=Depends(get_db),current_user:User=Depends(get_current_user)):
-    # fetch the cards details
-    response = {
-        "overview":{},
-        "line_graph":{},
-        "bar_graph":{},
-        "recent_activity":[{}]
-    }
-    response['overview']['total_earnings'] = get_total_earnings(db,current_user)
-    total_clicks,c_clicks,l_clicks = get_total_clicks(db,current_user)
-    response['overview']['total_clicks'] = total_clicks
-    total_purchases,c_purchases,l_purchases = get_total_purchases(db,current_user)
-    response['overview']['conversion_rate'] = find_conversion_rate(total_clicks.get('value'),total_purchases,c_purchases,l_purchases,c_clicks,l_clicks)
-    response['overview']['total_active_links'] = get_total_active_links(db,current_user)
-    response['monthly_earnings'] = get_monthly_earnings(db,current_user)
-    response['performance'] = get_click_conversion_week(db,current_user)
-    response['products'] = get_all_products(db,current_user,"",page=1,limit=10)
-    response['withdraw_history'] =  get_withdraw_history(db,current_user,page=1,limit=10)
-    response['withdraw_summary'] =  get_withdraw_summary(db,current_user)
-    response['withdraw_account_details'] = get_account_details(db,current_user)
-    return response
+async def get_affiliate_dashboard_(db:AsyncSession=Depends(get_async_db),current_user:User=Depends(get_current_user_async)):
+    return await db.run_sync(get_affiliate_dashboard,current_user)
 
 @router.get('/withdraw-history')
 def get_user_dashboard_courses(
-    db: Session = Depends(get_db), 
+    db: Session = Depends(get_read_db), 
     current_user=Depends(get_current_user),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
@@ -114,7 +92,7 @@ def get_user_dashboard_courses(
 
 @router.get('/product-history')
 def get_user_dashboard_product_history(
-    db: Session = Depends(get_db), 
+    db: Session = Depends(get_read_db), 
     current_user=Depends(get_current_user),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
@@ -140,69 +118,16 @@ def verify_user(user_id:str,db:Session=Depends(get_db),current_user:User=Depends
 
 @router.get("/all-items")
 def get_combined_items(
-    db: Session=Depends(get_db),
-    page: int = 1,
-    size: int = 10,
+    db: Session=Depends(get_read_db),
+    page: int = Query(1, ge=1),
+    size: int = Query(10, ge=1, le=100),
     search: str = "",
     filter: str = "all",  
 ):
-    search = search.strip()
-    filters = []
-    if search:
-        filters.append(or_(
-            Course.title.ilike(f"%{search}%"),
-            Course.description.ilike(f"%{search}%")
-        ))
-        ebook_filters = [or_(
-            EBook.title.ilike(f"%{search}%"),
-            EBook.description.ilike(f"%{search}%")
-        )]
+    item_types = {"all": ("course", "ebook"), "course": ("course",), "ebook": ("ebook",)}.get(filter, ())
+    if item_types:
+        res = get_catalog_items(db, item_types, page, size, search)
     else:
-        filters.append(True)
-        ebook_filters = [True]
-
-    items = []
-
-    if filter in ("all", "course"):
-        course_query = db.query(Course).filter(Course.visible == True, *filters)
-        items += [{
-            "id": course.id,
-            "title": course.title,
-            "description": course.description,
-            "price": course.price,
-            "commission": course.commission,
-            "thumbnail": course.thumbnail,
-            "intro_video": course.intro_video,
-            "type": "course"
-        } for course in course_query]
-
-    if filter in ("all", "ebook"):
-        ebook_query = db.query(EBook).filter(EBook.visible == True, *ebook_filters)
-        items += [{
-            "id": ebook.id,
-            "title": ebook.title,
-            "description": ebook.description,
-            "price": ebook.price,
-            "commission": ebook.commission,
-            "thumbnail": ebook.thumbnail,
-            "intro_video": ebook.intro_video,
-            "type": "ebook"
-        } for ebook in ebook_query]
-
-    # Sort by created_at descending (you can also sort by type then created_at if needed)
-    items.sort(key=lambda x: x.get("created_at", 0), reverse=True)
-
-    total = len(items)
-    start = (page - 1) * size
-    end = start + size
-    paginated = items[start:end]
-    admin_user_id = db.query(User).filter(User.is_admin == True).first().user_id
-    return   {
-        "total": total,
-        "limit": size,
-        "total_pages": math.ceil(total / size) if size else 1,
-        "has_prev": page > 1,
-        "has_next": end < total,
-        "items": paginated,
-        "affiliate_user_id":admin_user_id
-    }
\ No newline at end of file
+        res = {"total": 0, "limit": size, "total_pages": 0, "has_prev": page > 1, "has_next": False, "items": []}
+    res["affiliate_user_id"] = db.query(User).filter(User.is_admin == True).first().user_id
+    return res
\ No newline at end of file
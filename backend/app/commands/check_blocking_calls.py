@@ -0,0 +1,104 @@
+"""Flag blocking calls made directly inside `async def` functions.
+
+Sync SQLAlchemy sessions, file I/O and sync HTTP clients stall the event
+loop when called from a coroutine. Route handlers that need them should be
+plain `def` (FastAPI runs those in its threadpool) or hand the work to
+`run_in_threadpool`.
+
+Usage (from backend/app):
+    python -m commands.check_blocking_calls            # whole app minus alembic/commands
+    python -m commands.check_blocking_calls api/v1     # specific paths
+
+Exits with status 1 when anything is found, so it can gate CI.
+"""
+import ast
+import sys
+from pathlib import Path
+
+DEFAULT_PATHS = ["."]
+# Not request-serving code: migrations and one-off scripts
+EXCLUDED_DIRS = {"alembic", "commands", "media", "__pycache__"}
+# Names a sync Session is usually bound to
+SESSION_NAMES = {"db", "session"}
+BLOCKING_CALLS = {
+    "open",
+    "time.sleep",
+    "shutil.copyfileobj",
+    "os.remove",
+    "requests.get",
+    "requests.post",
+    "requests.request",
+    "httpx.get",
+    "httpx.post",
+    "httpx.request",
+}
+
+
+def call_name(node: ast.Call) -> str:
+    parts = []
+    func = node.func
+    while isinstance(func, ast.Attribute):
+        parts.append(func.attr)
+        func = func.value
+    if isinstance(func, ast.Name):
+        parts.append(func.id)
+    return ".".join(reversed(parts))
+
+
+def passes_session(node: ast.Call) -> bool:
+    args = list(node.args) + [keyword.value for keyword in node.keywords]
+    return any(isinstance(arg, ast.Name) and arg.id in SESSION_NAMES for arg in args)
+
+
+class CoroutineVisitor(ast.NodeVisitor):
+    def __init__(self, path: Path):
+        self.path = path
+        self.findings = []
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef):
+        for statement in node.body:
+            self._check(statement, node.name)
+
+    def _check(self, node: ast.AST, coroutine: str, awaited: bool = False):
+        # Nested functions run wherever they are called from, not in this coroutine
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            if isinstance(node, ast.AsyncFunctionDef):
+                self.visit_AsyncFunctionDef(node)
+            return
+        if isinstance(node, ast.Call) and not awaited:
+            name = call_name(node)
+            root = name.split(".")[0]
+            if name in BLOCKING_CALLS or (root in SESSION_NAMES and "." in name) or passes_session(node):
+                self.findings.append(f"{self.path}:{node.lineno}: blocking call '{name}' in async def {coroutine}")
+        for child in ast.iter_child_nodes(node):
+            self._check(child, coroutine, awaited=isinstance(node, ast.Await) and child is node.value)
+
+
+def check(paths) -> list:
+    findings = []
+    for root in paths:
+        root = Path(root)
+        files = [root] if root.is_file() else sorted(
+            path for path in root.rglob("*.py")
+            if not EXCLUDED_DIRS.intersection(path.relative_to(root).parts)
+        )
+        for path in files:
+            visitor = CoroutineVisitor(path)
+            visitor.visit(ast.parse(path.read_text(), filename=str(path)))
+            findings.extend(visitor.findings)
+    return findings
+
+
+def main(argv):
+    findings = check(argv or DEFAULT_PATHS)
+    for finding in findings:
+        print(finding)
+    if findings:
+        print(f"{len(findings)} blocking call(s) inside coroutines")
+        return 1
+    print("No blocking calls inside coroutines")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
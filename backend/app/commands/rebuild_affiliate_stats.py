@@ -0,0 +1,23 @@
+"""Rebuild affiliate_link_daily_stats from the raw click and purchase tables.
+
+Usage (from backend/app):
+    python -m commands.rebuild_affiliate_stats            # every link
+    python -m commands.rebuild_affiliate_stats 12 15 42   # only these link ids
+"""
+import sys
+from db.session import SessionLocal
+from crud.affiliate import rebuild_affiliate_link_daily_stats
+
+
+def main(argv):
+    link_ids = [int(arg) for arg in argv] or None
+    db = SessionLocal()
+    try:
+        rebuild_affiliate_link_daily_stats(db, link_ids)
+    finally:
+        db.close()
+    print(f"Rebuilt affiliate daily stats for {'all links' if link_ids is None else link_ids}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
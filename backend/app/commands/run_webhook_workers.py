@@ -0,0 +1,34 @@
+"""Run webhook fulfillment workers outside the API process.
+
+Usage (from backend/app):
+    python -m commands.run_webhook_workers        # WEBHOOK_WORKERS threads
+    python -m commands.run_webhook_workers 8      # 8 threads
+
+Set WEBHOOK_WORKERS=0 on the API nodes to leave fulfillment to these workers.
+"""
+import sys
+from core.config import settings
+from db.session import SessionLocal
+from lib.webhook_worker import WebhookWorkerPool
+
+
+def main(argv):
+    workers = int(argv[0]) if argv else max(settings.WEBHOOK_WORKERS, 1)
+    pool = WebhookWorkerPool(
+        SessionLocal,
+        workers=workers,
+        poll_seconds=settings.WEBHOOK_POLL_SECONDS,
+        lease_seconds=settings.WEBHOOK_LEASE_SECONDS,
+        max_attempts=settings.WEBHOOK_MAX_ATTEMPTS,
+        backoff_seconds=settings.WEBHOOK_RETRY_BACKOFF_SECONDS,
+    )
+    print(f"Starting {workers} webhook workers")
+    pool.start()
+    try:
+        pool.join()
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
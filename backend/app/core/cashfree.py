@@ -0,0 +1,118 @@
+import asyncio
+import random
+import httpx
+from core.config import settings
+
+
+class CashfreeError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class CashfreeClient:
+    """Cashfree PG client sharing one pooled `httpx.AsyncClient` per process.
+
+    Connections are kept alive between checkouts (HTTP/2 when the gateway
+    supports it). Transport errors and 429/5xx responses are retried with
+    exponential backoff; order creation stays idempotent because a retried
+    order id that already exists is fetched instead of recreated.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        base_url: str,
+        app_id: str,
+        secret_key: str,
+        api_version: str = "2022-09-01",
+        timeout: float = 10,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        max_retries: int = 3,
+        backoff_seconds: float = 0.2,
+        http2: bool = True,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.headers = {
+            "x-client-id": app_id,
+            "x-client-secret": secret_key,
+            "x-api-version": api_version,
+            "Content-Type": "application/json",
+        }
+        self.timeout = httpx.Timeout(timeout, connect=min(timeout, 5))
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.http2 = http2
+        self._client = None
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            base_url=settings.CASHFREE_PROD_BASE_URL if settings.PRODUCTION else settings.CASHFREE_TEST_BASE_URL,
+            app_id=settings.CASHFREE_APP_ID_PROD if settings.PRODUCTION else settings.CASHFREE_APP_ID_TEST,
+            secret_key=settings.CASHFREE_SECRET_KEY_PROD if settings.PRODUCTION else settings.CASHFREE_SECRET_KEY_TEST,
+            timeout=settings.CASHFREE_TIMEOUT_SECONDS,
+            max_connections=settings.CASHFREE_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.CASHFREE_MAX_KEEPALIVE_CONNECTIONS,
+            max_retries=settings.CASHFREE_MAX_RETRIES,
+            backoff_seconds=settings.CASHFREE_RETRY_BACKOFF_SECONDS,
+            http2=settings.CASHFREE_HTTP2,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop of the worker
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def create_order(self, payload: dict) -> dict:
+        response = await self._request("POST", "/orders", json=payload)
+        if response.status_code == 409:
+            # An earlier attempt reached Cashfree before failing on our side
+            return await self.get_order(payload["order_id"])
+        return self._json(response)
+
+    async def get_order(self, order_id: str) -> dict:
+        return self._json(await self._request("GET", f"/orders/{order_id}"))
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.request(method, path, **kwargs)
+                if response.status_code not in self.RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise CashfreeError(502, f"Payment gateway unreachable: {e}") from e
+            attempt += 1
+            delay = self.backoff_seconds * (2 ** (attempt - 1))
+            await asyncio.sleep(delay + random.uniform(0, delay))
+
+    @staticmethod
+    def _json(response: httpx.Response) -> dict:
+        if response.status_code != 200:
+            raise CashfreeError(response.status_code, response.text)
+        return response.json()
+
+
+cashfree_client = CashfreeClient.from_settings()
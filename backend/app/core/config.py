@@ -2,6 +2,14 @@ from pydantic import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    ASYNC_DB_POOL_SIZE: int = 10
+    ASYNC_DB_MAX_OVERFLOW: int = 20
+    DATABASE_REPLICA_URLS: str = ""  # comma separated; empty keeps all reads on the primary
+    REPLICA_POOL_SIZE: int = 10
+    REPLICA_MAX_OVERFLOW: int = 20
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_CHECK_SECONDS: float = 2.0
+    PRIMARY_PIN_SECONDS: int = 10
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_DAYS: int = 30
@@ -30,6 +38,36 @@ class Settings(BaseSettings):
     FRONTEND_URL:str
     RESEND_API_KEY:str
     RESEND_FROM_ADDRESS:str
+    CLICK_BUFFER_ENABLED: bool = True
+    CLICK_BUFFER_MAX_SIZE: int = 10000
+    CLICK_BUFFER_BATCH_SIZE: int = 500
+    CLICK_BUFFER_FLUSH_SECONDS: float = 1.0
+    CLICK_BUFFER_FLUSH_ATTEMPTS: int = 3
+    CLICK_BUFFER_RETRY_BACKOFF_SECONDS: float = 0.5
+    CACHE_BACKEND: str = "memory"  # memory | redis
+    CACHE_REDIS_URL: str | None = None
+    CACHE_MAX_ENTRIES: int = 4096
+    AFFILIATE_DASHBOARD_CACHE_TTL: int = 60
+    PRINCIPAL_CACHE_TTL: int = 60  # with CACHE_BACKEND=redis (invalidation reaches every worker)
+    PRINCIPAL_CACHE_MEMORY_TTL: int = 5  # cap for the memory backend, where invalidation is per worker
+    BCRYPT_ROUNDS: int = 12  # changing it re-hashes each password at the user's next login
+    PASSWORD_HASH_WORKERS: int = 2  # bcrypt process pool size; 0 hashes on the calling thread
+    ADMIN_DASHBOARD_REFRESH_SECONDS: float = 300
+    ADMIN_DASHBOARD_MIN_REFRESH_SECONDS: float = 5
+    CASHFREE_TIMEOUT_SECONDS: float = 10
+    CASHFREE_MAX_CONNECTIONS: int = 100
+    CASHFREE_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    CASHFREE_MAX_RETRIES: int = 3
+    CASHFREE_RETRY_BACKOFF_SECONDS: float = 0.2
+    CASHFREE_HTTP2: bool = True
+    WEBHOOK_WORKERS: int = 2  # 0 leaves fulfillment to commands.run_webhook_workers
+    WEBHOOK_POLL_SECONDS: float = 2
+    WEBHOOK_LEASE_SECONDS: int = 300
+    WEBHOOK_MAX_ATTEMPTS: int = 8
+    WEBHOOK_RETRY_BACKOFF_SECONDS: float = 30
+    COUPON_RESERVATION_TTL_MINUTES: int = 30  # also the Cashfree order expiry; gateway minimum is 15
+    COUPON_SWEEP_SECONDS: float = 60
+    COUPON_INDEX_CHECK_SECONDS: float = 5
     class Config:
         env_file = ".env"
 
@@ -1,9 +1,11 @@
 from fastapi import Depends,HTTPException,status,Response
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from core.security import decode_token
-from db.session import SessionLocal
-from crud.auth import get_user_by_email
+from db.session import SessionLocal,get_async_db
+from crud.auth import get_principal
+from core.principal import CurrentUser
 from models.user import User
 from fastapi import Header
 oauth2_scheme  = OAuth2PasswordBearer(tokenUrl='/api/v1/auth/login')
@@ -19,10 +21,10 @@ def get_current_user(token:str=Depends(oauth2_scheme),db:Session=Depends(get_db)
   email = decode_token(token)
   if email is None:
     raise HTTPException(status_code=401,detail="Invalid Token")
-  user = get_user_by_email(db,email)
-  if not user:
+  principal,user = get_principal(db,email)
+  if not principal:
     raise HTTPException(status_code=401,detail="User not found")
-  return user
+  return CurrentUser(principal,db,user)
 
 def is_admin_user(current_user:User=Depends(get_current_user)):
   if not current_user.is_admin:
@@ -32,6 +34,18 @@ def is_admin_user(current_user:User=Depends(get_current_user)):
       )
   return current_user
 
+async def get_current_user_async(token:str=Depends(oauth2_scheme),db:AsyncSession=Depends(get_async_db)):
+  email = decode_token(token)
+  if email is None:
+    raise HTTPException(status_code=401,detail="Invalid Token")
+  principal,user = await db.run_sync(get_principal,email)
+  if not principal:
+    raise HTTPException(status_code=401,detail="User not found")
+  return CurrentUser(principal,db.sync_session,user)
+
+async def is_admin_user_async(current_user:User=Depends(get_current_user_async)):
+  return is_admin_user(current_user)
+
 
 
 def get_optional_current_user(
@@ -44,5 +58,17 @@ def get_optional_current_user(
     email = decode_token(token)
     if not email:
         return None
-    user = get_user_by_email(db, email)
-    return user
\ No newline at end of file
+    principal, user = get_principal(db, email)
+    return CurrentUser(principal, db, user) if principal else None
+
+async def get_optional_current_user_async(
+    authorization: str = Header(default=None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    email = decode_token(authorization.split(" ")[1])
+    if not email:
+        return None
+    principal, user = await db.run_sync(get_principal, email)
+    return CurrentUser(principal, db.sync_session, user) if principal else None
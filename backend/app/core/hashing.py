@@ -0,0 +1,94 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from passlib.context import CryptContext
+from core.config import settings
+
+_contexts = {}
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _context(rounds: int) -> CryptContext:
+    # Built per process (workers are spawned) and per cost
+    ctx = _contexts.get(rounds)
+    if ctx is None:
+        ctx = _contexts[rounds] = CryptContext(schemes=['bcrypt'], deprecated='auto', bcrypt__rounds=rounds)
+    return ctx
+
+
+def _bcrypt_rounds(hashed: str):
+    try:
+        return int(hashed.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed: str, rounds: int):
+    ctx = _context(rounds)
+    if not ctx.verify(password, hashed):
+        return False, None
+    if ctx.needs_update(hashed) or _bcrypt_rounds(hashed) != rounds:
+        return True, ctx.hash(password)
+    return True, None
+
+
+def get_executor():
+    """Process pool for bcrypt; None when PASSWORD_HASH_WORKERS is 0 (hash inline)."""
+    global _executor
+    # Spawned workers re-import the parent's __main__ (e.g. a command that imports
+    # db.session); anything they hash during that import runs inline.
+    if settings.PASSWORD_HASH_WORKERS <= 0 or multiprocessing.parent_process() is not None:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            # spawn: the parent runs background threads, which fork does not copy safely
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _run(fn, *args):
+    executor = get_executor()
+    if executor is None:
+        return fn(*args)
+    return executor.submit(fn, *args).result()
+
+
+async def _run_async(fn, *args):
+    executor = get_executor()
+    if executor is None:
+        return await asyncio.to_thread(fn, *args)
+    return await asyncio.wrap_future(executor.submit(fn, *args))
+
+
+def hash_password(password: str) -> str:
+    return _run(_hash, password, settings.BCRYPT_ROUNDS)
+
+
+def verify_and_update(password: str, hashed: str):
+    """(matches, new_hash); new_hash is set when `hashed` was made with a different cost."""
+    return _run(_verify_and_update, password, hashed, settings.BCRYPT_ROUNDS)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_async(_hash, password, settings.BCRYPT_ROUNDS)
+
+
+async def verify_and_update_async(password: str, hashed: str):
+    return await _run_async(_verify_and_update, password, hashed, settings.BCRYPT_ROUNDS)
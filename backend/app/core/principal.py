@@ -0,0 +1,60 @@
+from typing import NamedTuple
+from models.user import User
+
+
+class Principal(NamedTuple):
+    """The fields auth checks need, cached per token subject (see crud.auth.get_principal)."""
+    id: int
+    user_id: str
+    is_admin: bool
+    email: str
+
+    @classmethod
+    def from_user(cls, user: User):
+        return cls(user.id, user.user_id, bool(user.is_admin), user.email)
+
+
+class CurrentUser:
+    """Authenticated user for one request.
+
+    `id`, `user_id`, `is_admin` and `email` come from the cached principal
+    without touching the database; any other attribute loads the full `User`
+    through the request's session on first use. Handlers that need the ORM
+    instance itself (relationships, `db.add`, response models) call `load()`.
+    """
+
+    __slots__ = ("principal", "_session", "_user")
+
+    def __init__(self, principal: Principal, session, user: User | None = None):
+        object.__setattr__(self, "principal", principal)
+        object.__setattr__(self, "_session", session)
+        object.__setattr__(self, "_user", user)
+
+    @property
+    def id(self):
+        return self.principal.id
+
+    @property
+    def user_id(self):
+        return self.principal.user_id
+
+    @property
+    def is_admin(self):
+        return self.principal.is_admin
+
+    @property
+    def email(self):
+        return self.principal.email
+
+    def load(self, db=None) -> User:
+        # For async routes the session is an AsyncSession's sync_session, which
+        # only works inside `await db.run_sync(...)`.
+        if self._user is None:
+            object.__setattr__(self, "_user", (db or self._session).get(User, self.principal.id))
+        return self._user
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.load(), name, value)
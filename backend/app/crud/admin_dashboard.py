@@ -3,11 +3,15 @@ from models.affiliate import Withdraw
 from models.user import User
 from datetime import datetime, timedelta
 from datetime import datetime, timedelta, timezone
-from sqlalchemy import func
+from sqlalchemy import func, select, update
+from crud.timeseries import time_series,shift_months
 from schemas.affiliate import *
 from models.course import Course
 from models.ebook import EBook
 from models.purchase import Purchase
+from models.utils import AdminDashboardSnapshot
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from fastapi.encoders import jsonable_encoder
 def get_total_users(db: Session) -> int:
     return db.query(User).count()
 
@@ -15,19 +19,14 @@ def get_total_courses(db: Session) -> int:
     return db.query(Course).count()
 def get_total_ebooks(db: Session) -> int:
     return db.query(EBook).count()
-def get_total_sales(db: Session) -> int:
-    count =  db.query(Purchase).count()
-    purchases = db.query(Purchase).all()
-    total_amount = 0
-    for purchase in purchases:
-        if purchase.item_type == 'course':
-            db_course = db.query(Course).filter(Course.id == purchase.item_id).first()
-            if db_course:
-                total_amount += db_course.price 
-        elif purchase.item_type == 'ebook':
-            db_ebook = db.query(EBook).filter(EBook.id == purchase.item_id).first()
-            if db_ebook:
-                total_amount += db_ebook.price
+# Revenue actually charged for a purchase
+CHARGED_AMOUNT = func.coalesce(Purchase.amount, 0) - func.coalesce(Purchase.discount, 0)
+
+def get_total_sales(db: Session) -> dict:
+    count, total_amount = db.query(
+        func.count(Purchase.id),
+        func.coalesce(func.sum(CHARGED_AMOUNT), 0)
+    ).one()
     return {
         "count": count,
         "total_amount": total_amount
@@ -52,45 +51,88 @@ def get_total_withdrawals_by_status(db: Session, status: str) -> dict:
         "total_amount": total_amount
     }
 
-def get_total_sales_by_month_last_year(db: Session) -> list:
-    end_date = datetime.now(timezone.utc)
-    start_date = end_date - timedelta(days=365)
+def get_total_sales_by_month_last_year(db: Session, start=None, end=None, granularity: str = 'month') -> list:
+    # Defaults to the last 12 calendar months, current month included
+    end = end or datetime.utcnow()
+    start = start or shift_months(end, -11)
+    rows = time_series(
+        db,
+        Purchase.created_at,
+        {'sales': func.sum(CHARGED_AMOUNT)},
+        start,
+        end,
+        granularity,
+    )
+    return [{"month": row.bucket, "sales": row.sales} for row in rows]
 
-    purchases = db.query(
-        func.extract('year', Purchase.created_at).label('year'),
-        func.extract('month', Purchase.created_at).label('month')
-    ).filter(
-        Purchase.created_at >= start_date,
-        Purchase.created_at <= end_date
-    ).group_by('year', 'month').all()
+ADMIN_DASHBOARD_SNAPSHOT_ID = 1
+# Arbitrary key for the advisory lock that serialises snapshot refreshes across workers
+ADMIN_DASHBOARD_LOCK_KEY = 7301
 
-    # Create keys like '2024-07'
-    sales_data = {
-        f"{int(purchase.year):04d}-{int(purchase.month):02d}": 0
-        for purchase in purchases
+def build_admin_dashboard(db: Session) -> dict:
+    return {
+        "overview": {
+            "total_users": get_total_users(db),
+            "total_courses": get_total_courses(db),
+            "total_ebooks": get_total_ebooks(db),
+            "total_sales": get_total_sales(db),
+        },
+        "line_graph": {
+            "total_users": get_total_sales_by_month_last_year(db),
+        },
+        "withdrawals": {
+            "total_paid_withdrawals": get_total_withdrawals_by_status(db, 'success'),
+            "total_pending_withdrawals": get_total_withdrawals_by_status(db, 'pending'),
+            "total_withdrawals": get_total_withdrawals_by_status(db, ''),
+        },
     }
 
-    for purchase in db.query(Purchase).filter(
-        Purchase.created_at >= start_date,
-        Purchase.created_at <= end_date
-    ).all():
-        month_str = purchase.created_at.strftime('%Y-%m')
-        if purchase.item_type == 'course':
-            db_course = db.query(Course).filter(Course.id == purchase.item_id).first()
-            if db_course:
-                sales_data[month_str] = sales_data.get(month_str, 0) + db_course.price
-        elif purchase.item_type == 'ebook':
-            db_ebook = db.query(EBook).filter(EBook.id == purchase.item_id).first()
-            if db_ebook:
-                sales_data[month_str] = sales_data.get(month_str, 0) + db_ebook.price
+def refresh_admin_dashboard_snapshot(db: Session) -> AdminDashboardSnapshot | None:
+    """Recompute and store the dashboard; returns None if another worker is already refreshing."""
+    locked = db.execute(select(func.pg_try_advisory_xact_lock(ADMIN_DASHBOARD_LOCK_KEY))).scalar()
+    if not locked:
+        db.rollback()
+        return None
+    # Stamped before building so a refresh requested mid-build triggers another one
+    started_at = datetime.now(timezone.utc)
+    values = {
+        "id": ADMIN_DASHBOARD_SNAPSHOT_ID,
+        "payload": jsonable_encoder(build_admin_dashboard(db)),
+        "as_of": started_at,
+    }
+    stmt = pg_insert(AdminDashboardSnapshot).values(**values)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[AdminDashboardSnapshot.id],
+        set_={"payload": stmt.excluded.payload, "as_of": stmt.excluded.as_of},
+    ))
+    db.commit()
+    return db.get(AdminDashboardSnapshot, ADMIN_DASHBOARD_SNAPSHOT_ID)
 
-    result = []
-    for i in range(12):
-        month = (end_date - timedelta(days=i * 30)).strftime('%Y-%m')
-        result.append({
-            "month": month,
-            "sales": sales_data.get(month, 0)
-        })
+def request_admin_dashboard_refresh(db: Session):
+    db.execute(
+        update(AdminDashboardSnapshot)
+        .where(AdminDashboardSnapshot.id == ADMIN_DASHBOARD_SNAPSHOT_ID)
+        .values(refresh_requested_at=func.now())
+    )
+    db.commit()
 
-    return result[::-1]  # reverse to show oldest month first
+def admin_dashboard_refresh_due(db: Session, max_age_seconds: float) -> bool:
+    """True when the snapshot is missing, older than max_age_seconds or has a newer refresh request."""
+    row = db.execute(
+        select(AdminDashboardSnapshot.as_of, AdminDashboardSnapshot.refresh_requested_at)
+        .where(AdminDashboardSnapshot.id == ADMIN_DASHBOARD_SNAPSHOT_ID)
+    ).first()
+    db.rollback()
+    if row is None:
+        return True
+    if row.refresh_requested_at and row.refresh_requested_at > row.as_of:
+        return True
+    return row.as_of < datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)
 
+def get_admin_dashboard_snapshot(db: Session, build_if_missing: bool = True) -> AdminDashboardSnapshot | None:
+    # Pass build_if_missing=False on a replica session; the inline build writes
+    snapshot = db.get(AdminDashboardSnapshot, ADMIN_DASHBOARD_SNAPSHOT_ID)
+    if snapshot is None and build_if_missing:
+        # First request after deploy: build it inline
+        snapshot = refresh_admin_dashboard_snapshot(db)
+    return snapshot
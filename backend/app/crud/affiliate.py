@@ -1,10 +1,11 @@
 
 from sqlalchemy.orm import Session
-from models.affiliate import AffiliateLink,AffiliateAccount ,AffiliateLinkClick,AffiliateLinkPurchase,Withdraw,UPIDetails,BankDetails
+from models.affiliate import AffiliateLink,AffiliateAccount ,AffiliateLinkClick,AffiliateLinkPurchase,Withdraw,UPIDetails,BankDetails,AffiliateLinkDailyStats
 from models.user import User
 from datetime import datetime, timedelta
 from datetime import datetime, timedelta, timezone
-from sqlalchemy import func
+from sqlalchemy import func, select, literal, union_all, cast, Date, delete, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from schemas.affiliate import  *
 from crud.utils import to_pagination_response
 from schemas.user import UserResponse
@@ -25,6 +26,16 @@ def get_affiliate_link_by_all(db: Session, user_id: int, item_id: int, item_type
         AffiliateLink.item_type == item_type
     ).first()
 
+def get_affiliate_linked_item_ids(db: Session, user_id: int, item_type: str, item_ids: list):
+    if not item_ids:
+        return set()
+    rows = db.query(AffiliateLink.item_id).filter(
+        AffiliateLink.user_id == user_id,
+        AffiliateLink.item_type == item_type,
+        AffiliateLink.item_id.in_(item_ids)
+    ).all()
+    return {row.item_id for row in rows}
+
 def get_affiliate_account_by_user_id(db: Session, user_id: int):
     return db.query(AffiliateAccount).filter(AffiliateAccount.user_id == user_id).first()
 
@@ -34,6 +45,7 @@ def get_affiliate_account_by_id(db: Session, id: int):
 def add_clicks_to_affiliate_link(db: Session, affiliate_link: AffiliateLink):
     db_link_click = AffiliateLinkClick(link_id=affiliate_link.id)
     db.add(db_link_click)
+    record_affiliate_link_daily_stats(db, affiliate_link.id, clicks=1)
     db.commit()
     db.refresh(db_link_click)
     return db_link_click
@@ -41,28 +53,89 @@ def add_clicks_to_affiliate_link(db: Session, affiliate_link: AffiliateLink):
 def add_purchase_to_affiliate_link(db: Session, affiliate_link: AffiliateLink,amount=0,commit=True):
     db_link_click = AffiliateLinkPurchase(link_id=affiliate_link.id,amount=amount)
     db.add(db_link_click)
+    record_affiliate_link_daily_stats(db, affiliate_link.id, purchases=1, earnings=amount or 0)
     if commit:
         db.commit()
         db.refresh(db_link_click)
     return db_link_click
 
-def get_total_clicks(db:Session,user:User):
-    links = user.affiliate_links
-    now = datetime.now(timezone.utc)
-    # First day of current and last month
-    start_of_current_month = now.replace(day=1)
+def record_affiliate_link_daily_stats(db: Session, link_id: int, clicks: int = 0, purchases: int = 0, earnings: float = 0, day=None):
+    # Upsert into today's (UTC) rollup row; runs in the caller's transaction
+    day = day or datetime.now(timezone.utc).date()
+    upsert_affiliate_link_daily_stats(db, [{
+        'link_id': link_id, 'day': day, 'clicks': clicks, 'purchases': purchases, 'earnings': earnings
+    }])
+
+def upsert_affiliate_link_daily_stats(db: Session, rows: list):
+    # rows must hold at most one entry per (link_id, day)
+    if not rows:
+        return
+    stmt = pg_insert(AffiliateLinkDailyStats).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AffiliateLinkDailyStats.link_id, AffiliateLinkDailyStats.day],
+        set_={
+            'clicks': AffiliateLinkDailyStats.clicks + stmt.excluded.clicks,
+            'purchases': AffiliateLinkDailyStats.purchases + stmt.excluded.purchases,
+            'earnings': AffiliateLinkDailyStats.earnings + stmt.excluded.earnings,
+        }
+    )
+    db.execute(stmt)
+
+def rebuild_affiliate_link_daily_stats(db: Session, link_ids: list | None = None):
+    """Recompute the daily rollup from the raw click and purchase tables."""
+    click_day = cast(func.timezone('UTC', AffiliateLinkClick.created_at), Date)
+    purchase_day = cast(func.timezone('UTC', AffiliateLinkPurchase.created_at), Date)
+    click_rows = select(
+        AffiliateLinkClick.link_id.label('link_id'),
+        click_day.label('day'),
+        func.count(AffiliateLinkClick.id).label('clicks'),
+        literal(0).label('purchases'),
+        literal(0).label('earnings'),
+    ).group_by(AffiliateLinkClick.link_id, click_day)
+    purchase_rows = select(
+        AffiliateLinkPurchase.link_id.label('link_id'),
+        purchase_day.label('day'),
+        literal(0).label('clicks'),
+        func.count(AffiliateLinkPurchase.id).label('purchases'),
+        func.coalesce(func.sum(AffiliateLinkPurchase.amount), 0).label('earnings'),
+    ).group_by(AffiliateLinkPurchase.link_id, purchase_day)
+    if link_ids is not None:
+        click_rows = click_rows.where(AffiliateLinkClick.link_id.in_(link_ids))
+        purchase_rows = purchase_rows.where(AffiliateLinkPurchase.link_id.in_(link_ids))
+    daily = union_all(click_rows, purchase_rows).subquery()
+    rollup = select(
+        daily.c.link_id,
+        daily.c.day,
+        func.sum(daily.c.clicks),
+        func.sum(daily.c.purchases),
+        func.sum(daily.c.earnings),
+    ).where(daily.c.link_id.isnot(None)).group_by(daily.c.link_id, daily.c.day)
+
+    clear = delete(AffiliateLinkDailyStats)
+    if link_ids is not None:
+        clear = clear.where(AffiliateLinkDailyStats.link_id.in_(link_ids))
+    db.execute(clear)
+    db.execute(pg_insert(AffiliateLinkDailyStats).from_select(
+        ['link_id', 'day', 'clicks', 'purchases', 'earnings'], rollup
+    ))
+    db.commit()
+
+def _monthly_window_totals(db: Session, user: User, column):
+    # Lifetime, current-month and last-month sums over all of the user's links in one pass
+    today = datetime.now(timezone.utc).date()
+    start_of_current_month = today.replace(day=1)
     start_of_last_month = (start_of_current_month - timedelta(days=1)).replace(day=1)
-    end_of_last_month = start_of_current_month - timedelta(seconds=1)
-    current_month_clicks = 0
-    last_month_clicks = 0
-    total_clicks = 0
-    for link in links:
-        for click in link.clicks:
-            if start_of_current_month <= click.created_at <= now:
-                current_month_clicks += 1
-            elif start_of_last_month <= click.created_at <= end_of_last_month:
-                last_month_clicks += 1
-            total_clicks+=1
+    day = AffiliateLinkDailyStats.day
+    return db.query(
+        func.coalesce(func.sum(column), 0),
+        func.coalesce(func.sum(column).filter(day >= start_of_current_month), 0),
+        func.coalesce(func.sum(column).filter(and_(day >= start_of_last_month, day < start_of_current_month)), 0),
+    ).join(
+        AffiliateLink, AffiliateLink.id == AffiliateLinkDailyStats.link_id
+    ).filter(AffiliateLink.user_id == user.id).one()
+
+def get_total_clicks(db:Session,user:User):
+    total_clicks, current_month_clicks, last_month_clicks = _monthly_window_totals(db, user, AffiliateLinkDailyStats.clicks)
     # Percentage hike calculation
     if last_month_clicks == 0:
         percent_hike = 100 if current_month_clicks > 0 else 0
@@ -72,25 +145,7 @@ def get_total_clicks(db:Session,user:User):
     return {'value':total_clicks,'hike':round(percent_hike, 2)},current_month_clicks,last_month_clicks
     
 def get_total_purchases(db: Session, user: User):
-    links = user.affiliate_links
-    now = datetime.now(timezone.utc)
-
-    # First day of current and last month
-    start_of_current_month = now.replace(day=1)
-    start_of_last_month = (start_of_current_month - timedelta(days=1)).replace(day=1)
-    end_of_last_month = start_of_current_month - timedelta(seconds=1)
-
-    current_month_purchases = 0
-    last_month_purchases = 0
-    total_purchases = 0
-
-    for link in links:
-        for purchase in link.purchases:
-            if start_of_current_month <= purchase.created_at <= now:
-                current_month_purchases += 1
-            elif start_of_last_month <= purchase.created_at <= end_of_last_month:
-                last_month_purchases += 1
-            total_purchases += 1
+    total_purchases, current_month_purchases, last_month_purchases = _monthly_window_totals(db, user, AffiliateLinkDailyStats.purchases)
     return total_purchases,current_month_purchases,last_month_purchases
 
 def find_conversion_rate(t_clicks, t_purchases, c_purchases, l_purchases, c_clicks, l_clicks):
@@ -117,45 +172,24 @@ def find_conversion_rate(t_clicks, t_purchases, c_purchases, l_purchases, c_clic
     }
 
 def get_total_active_links(db:Session,user:User):
-    links = user.affiliate_links
-    one_month_ago = datetime.utcnow() - timedelta(days=30)
-    total_active_link = 0
-    for link in links:
-        click_count = db.query(AffiliateLinkClick).filter(
-        AffiliateLinkClick.link_id ==link.id,
-        AffiliateLinkClick.created_at >= one_month_ago
-        ).count()
-        purchase_count = db.query(AffiliateLinkPurchase).filter(
-        AffiliateLinkPurchase.link_id == link.id,
-        AffiliateLinkPurchase.created_at >= one_month_ago
-        ).count()
-        print(click_count,purchase_count)
-        if click_count and purchase_count:
-            total_active_link+=1
-    return total_active_link
+    # A link is active when it had both clicks and purchases in the last 30 days
+    one_month_ago = (datetime.now(timezone.utc) - timedelta(days=30)).date()
+    active_links = db.query(AffiliateLinkDailyStats.link_id).join(
+        AffiliateLink, AffiliateLink.id == AffiliateLinkDailyStats.link_id
+    ).filter(
+        AffiliateLink.user_id == user.id,
+        AffiliateLinkDailyStats.day >= one_month_ago
+    ).group_by(AffiliateLinkDailyStats.link_id).having(and_(
+        func.sum(AffiliateLinkDailyStats.clicks) > 0,
+        func.sum(AffiliateLinkDailyStats.purchases) > 0
+    )).subquery()
+    return db.query(func.count()).select_from(active_links).scalar()
 
 def get_total_earnings(db: Session, user: User):
-    total_earnings = get_or_create_affiliate_account(db,user.id).total_earnings
-    now = datetime.now(timezone.utc)
-    start_of_current_month = now.replace(day=1)
-    start_of_last_month = (start_of_current_month - timedelta(days=1)).replace(day=1)
-    end_of_last_month = start_of_current_month - timedelta(seconds=1)
-
-    # Get the user's affiliate link IDs
-    link_ids = [link.id for link in user.affiliate_links]
-
-    # Earnings for this month
-    this_month_total_earnings = db.query(func.coalesce(func.sum(AffiliateLinkPurchase.amount), 0)).filter(
-        AffiliateLinkPurchase.link_id.in_(link_ids),
-        AffiliateLinkPurchase.created_at >= start_of_current_month,
-        AffiliateLinkPurchase.created_at <= now
-    ).scalar()
-    # Earnings for last month
-    last_month_total_earnings = db.query(func.coalesce(func.sum(AffiliateLinkPurchase.amount), 0)).filter(
-        AffiliateLinkPurchase.link_id.in_(link_ids),
-        AffiliateLinkPurchase.created_at >= start_of_last_month,
-        AffiliateLinkPurchase.created_at <= end_of_last_month
-    ).scalar()
+    # Read-only (the dashboard can be served from a replica); no account yet means nothing earned
+    affiliate_account = get_affiliate_account_by_user_id(db,user.id)
+    total_earnings = affiliate_account.total_earnings if affiliate_account else 0
+    _, this_month_total_earnings, last_month_total_earnings = _monthly_window_totals(db, user, AffiliateLinkDailyStats.earnings)
     # Hike calculation
     if last_month_total_earnings == 0:
         hike = 100 if this_month_total_earnings > 0 else 0
@@ -252,7 +286,9 @@ def get_withdrawals_by_status(
     page: int = 1,
     limit: int = 10,
     search: str = '',
-    status: str | None = None
+    status: str | None = None,
+    cursor: str | None = None,
+    count: str = 'exact'
 ):
     query = db.query(Withdraw).join(User)
     if status and status != 'all':
@@ -263,7 +299,7 @@ def get_withdrawals_by_status(
         query = query.filter(User.name.ilike(f"%{search}%"))
 
     query = query.order_by(Withdraw.created_at.desc())
-    data = to_pagination_response(query, WithdrawResponse, page, limit)
+    data = to_pagination_response(query, WithdrawResponse, page, limit, cursor, count)
 
     items = data.get('items', [])
 
@@ -1,7 +1,6 @@
 from sqlalchemy.orm import Session
 from models.user import User,TempUser
 from schemas.user import UserCreate
-from passlib.context import CryptContext
 import uuid
 import base64
 from models.affiliate import AffiliateAccount
@@ -11,29 +10,69 @@ from schemas.user import UserResponse
 from models.purchase import Purchase
 from sqlalchemy import cast, String
 from .utils import send_reset_email
-pwd_context = CryptContext(schemes=['bcrypt'],deprecated='auto')
+from core.cache import cache
+from core.config import settings
+from core.principal import Principal
+from core.hashing import hash_password,verify_and_update,verify_and_update_async
+from fastapi.concurrency import run_in_threadpool
 
 
 def get_user_by_email(db:Session,email:str):
   return db.query(User).filter(User.email==email).first()
 
-def create_user(db:Session,user:UserCreate,is_hashed_pw=False):
+def _principal_cache_key(email:str):
+  return f"principal:{email}"
+
+def principal_cache_ttl():
+  # The memory backend only invalidates in the current worker, so a demoted
+  # admin or deleted user stays authorised elsewhere for up to this long
+  if settings.CACHE_BACKEND == "redis":
+    return settings.PRINCIPAL_CACHE_TTL
+  return min(settings.PRINCIPAL_CACHE_TTL,settings.PRINCIPAL_CACHE_MEMORY_TTL)
+
+def get_principal(db:Session,email:str):
+  """(principal, user) for a token subject; user is None on a cache hit."""
+  key = _principal_cache_key(email)
+  cached = cache.get(key)
+  if cached is not None:
+    return Principal(*cached),None
+  user = get_user_by_email(db,email)
+  if not user:
+    return None,None
+  principal = Principal.from_user(user)
+  cache.set(key,list(principal),principal_cache_ttl())
+  return principal,user
+
+def invalidate_principal(email:str|None):
+  """Call after a user's password, admin flag or existence changes.
+
+  Immediate for every worker only with CACHE_BACKEND=redis; with the memory
+  backend other workers catch up within PRINCIPAL_CACHE_MEMORY_TTL seconds.
+  """
+  if email:
+    cache.delete(_principal_cache_key(email))
+
+def create_user(db:Session,user:UserCreate,is_hashed_pw=False,commit=True):
   if not is_hashed_pw:
-    hashed_pw = pwd_context.hash(user.password)
+    hashed_pw = hash_password(user.password)
   else:
     hashed_pw = user.password
   user_id = create_user_id(db)
   db_user = User(email=user.email,password=hashed_pw,user_id=user_id,name=user.name,phone=user.phone)
   db.add(db_user)
-  db.commit()
-  db.refresh(db_user)
+  if commit:
+    db.commit()
+    db.refresh(db_user)
+  else:
+    db.flush()
   return db_user
 
-def update_user_password(db:Session,user:User,password:str):
-  hashed_pw = pwd_context.hash(password)
+def update_user_password(db:Session,user:User,password:str,is_hashed_pw=False):
+  hashed_pw = password if is_hashed_pw else hash_password(password)
   setattr(user,'password',hashed_pw)
   db.commit()
   db.refresh(user)
+  invalidate_principal(user.email)
   return user
 
 def get_temp_user_by_email(db:Session,email:str):
@@ -42,16 +81,16 @@ def get_temp_user_by_email(db:Session,email:str):
 def get_temp_user_by_id(db:Session,id:str):
   return db.query(TempUser).filter(TempUser.id==id).first()
 
-def create_temp_user(db:Session,data):
-  hashed_pw = pwd_context.hash(data.get('password'))
+def create_temp_user(db:Session,data,is_hashed_pw=False):
+  hashed_pw = data.get('password') if is_hashed_pw else hash_password(data.get('password'))
   db_user = TempUser(email=data.get('email'),password=hashed_pw,name=data.get('name'),phone=data.get('phone'))
   db.add(db_user)
   db.commit()
   db.refresh(db_user)
   return db_user
 
-def update_temp_user(db:Session,temp_user:TempUser,data):
-  hashed_pw = pwd_context.hash(data.get('password'))
+def update_temp_user(db:Session,temp_user:TempUser,data,is_hashed_pw=False):
+  hashed_pw = data.get('password') if is_hashed_pw else hash_password(data.get('password'))
   setattr(temp_user,'password',hashed_pw)
   setattr(temp_user,'email',data.get('email'))
   setattr(temp_user,'name',data.get('name'))
@@ -61,7 +100,30 @@ def update_temp_user(db:Session,temp_user:TempUser,data):
   return temp_user
 
 def verify_password(plain_password, hashed_password):
-  return pwd_context.verify(plain_password, hashed_password)
+  return verify_and_update(plain_password, hashed_password)[0]
+
+async def authenticate_user(db:Session,email:str,password:str):
+  """User for valid credentials, else None; re-hashes at the current BCRYPT_ROUNDS when it changed.
+
+  bcrypt runs in the hashing pool and the queries in the threadpool, so no
+  request thread waits on the hash.
+  """
+  user = await run_in_threadpool(get_user_by_email,db,email)
+  if not user:
+    return None
+  valid,new_hash = await verify_and_update_async(password,user.password)
+  if not valid:
+    return None
+  if new_hash:
+    user = await run_in_threadpool(update_user_password,db,user,new_hash,True)
+  return user
+
+def register_user(db:Session,user:UserCreate):
+  """Create a user (password already hashed) with their affiliate account."""
+  db_user = create_user(db,user,is_hashed_pw=True,commit=False)
+  create_affiliate_account(db,db_user.id)
+  db.refresh(db_user)
+  return db_user
 
 def get_user_by_id(db:Session,id:str):
   return db.query(User).filter(User.id == id).first()
@@ -80,15 +142,16 @@ def short_uuid(length=15):
     uid = uuid.uuid4()
     return base64.urlsafe_b64encode(uid.bytes).decode('utf-8').rstrip('=')[:length]
 
-def create_affiliate_account(db:Session,user_id:int):
+def create_affiliate_account(db:Session,user_id:int,commit=True):
   db_account =  AffiliateAccount(balance=0,user_id=user_id)
   db.add(db_account)
-  db.commit()
-  db.refresh(db_account)
+  if commit:
+    db.commit()
+    db.refresh(db_account)
   return db_account
 
 
-def get_all_users(db:Session,page:int=1,limit:int=10,search:str=''):
+def get_all_users(db:Session,page:int=1,limit:int=10,search:str='',cursor:str|None=None,count:str='exact'):
   query = db.query(User)
   if search:
     
@@ -100,7 +163,7 @@ def get_all_users(db:Session,page:int=1,limit:int=10,search:str=''):
             cast(User.id, String).ilike(f'%{search}%')  # cast id to string
         )
     )
-  data =  to_pagination_response(query,UserResponse,page,limit)
+  data =  to_pagination_response(query,UserResponse,page,limit,cursor,count)
   items = data.get('items')
   for i,user in enumerate(items):
     db_purchase = db.query(Purchase).filter(Purchase.purchased_user_id==None,Purchase.affiliate_user_id == user.get('id')).first()
@@ -1,13 +1,40 @@
 from sqlalchemy.orm import Session
 from models.coupon import Coupon
-from schemas.coupon_code import CouponCodeCreate,CouponCodeUpdate
+from schemas.coupon_code import CouponCodeCreate,CouponCodeUpdate,CouponCodeBulkCreate
+import secrets
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from fastapi import HTTPException
 from core.config import settings
 from schemas.coupon_code import CouponCodeResponse
 from crud.utils import to_pagination_response
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import update, func
+from models.purchase import TransactionProcessing
+from lib.coupon_index import coupon_index,CouponRule
 def get_coupon_by_code(db:Session,code:str):
   return db.query(Coupon).filter(Coupon.code == code,Coupon.visible == True).first()
 
+def get_coupon_rule(db:Session,code:str) -> CouponRule | None:
+  # Served from the in-process index; only a version check may touch the DB
+  return coupon_index.get(db,code)
+
+def get_coupon_remaining_uses(db:Session,code:str) -> int:
+  remaining = db.query(Coupon.no_of_access - func.coalesce(Coupon.used,0)).filter(Coupon.code == code).scalar()
+  return remaining or 0
+
+def calculate_coupon_discount(rule:CouponRule,amount:float) -> float:
+  """Validate a coupon against an order amount and return the discount."""
+  if rule.min_purchase and amount < rule.min_purchase:
+    raise HTTPException(status_code=400,detail="Minimum purchase amount not met")
+  if rule.type == 'percentage':
+    return (amount * rule.discount) / 100
+  if rule.type == 'flat':
+    return min(rule.discount,amount)
+  # The model's 'fixed' default has never taken money off; keep pricing unchanged
+  return 0
+
 def get_coupon_by_id(db:Session,coupon_id:str):
   return db.query(Coupon).filter(Coupon.id == coupon_id).first()
 
@@ -16,14 +43,40 @@ def create_coupon_code(db:Session,data:CouponCodeCreate):
   db.add(db_coupon)
   db.commit()
   db.refresh(db_coupon)
+  coupon_index.invalidate()
   return db_coupon
 
+# No 0/O or 1/I so printed codes are easy to read back
+COUPON_CODE_ALPHABET = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+
+def create_bulk_coupon_codes(db:Session,data:CouponCodeBulkCreate) -> list:
+  """Generate `data.count` new unique codes sharing one set of rules and insert them in one statement."""
+  prefix = data.prefix.strip().upper()
+  if len(COUPON_CODE_ALPHABET) ** data.length < data.count * 4:
+    raise HTTPException(status_code=400,detail="Code length too short for this many codes")
+  taken = set(db.execute(select(Coupon.code).where(Coupon.code.startswith(prefix, autoescape=True))).scalars())
+  codes = set()
+  while len(codes) < data.count:
+    code = prefix + ''.join(secrets.choice(COUPON_CODE_ALPHABET) for _ in range(data.length))
+    if code not in taken:
+      codes.add(code)
+  rules = data.dict(exclude={'prefix','count','length'})
+  # Executed as batched multi-row INSERT ... VALUES (insertmanyvalues); a code taken concurrently is skipped
+  inserted = db.execute(
+    pg_insert(Coupon).on_conflict_do_nothing(index_elements=[Coupon.code]).returning(Coupon.code),
+    [{**rules,'code':code,'used':0,'visible':True} for code in codes]
+  ).scalars().all()
+  db.commit()
+  coupon_index.invalidate()
+  return inserted
+
 def update_coupon_code(db:Session,db_coupon:Coupon,data:CouponCodeUpdate):
   
   for key,value in data.dict(exclude_unset=True).items():
     setattr(db_coupon,key,value)
   db.commit()
   db.refresh(db_coupon)
+  coupon_index.invalidate()
   return db_coupon
 
 def delete_coupon_code(db:Session,coupon_id:int):
@@ -32,14 +85,66 @@ def delete_coupon_code(db:Session,coupon_id:int):
     raise HTTPException(status_code=404,detail="Coupon not found")
   db.delete(db_coupon)
   db.commit()
+  coupon_index.invalidate()
   return {"detail": "Coupon deleted successfully"}
 
-def get_all_coupons(db:Session,page: int = 0,limit:int=10,search:str='',filter:str='all'):
+def get_all_coupons(db:Session,page: int = 0,limit:int=10,search:str='',filter:str='all',cursor:str|None=None,count:str='exact'):
   query = db.query(Coupon).order_by(Coupon.created_at.desc())
   if filter and filter != 'all':
     query = query.filter(Coupon.type == filter)
   if search:
     query = query.filter(Coupon.code.ilike(f"%{search}%"))
-  return to_pagination_response(query,CouponCodeResponse,page,limit)
+  return to_pagination_response(query,CouponCodeResponse,page,limit,cursor,count)
 
+# Use counters keep updated_at unchanged so they do not bump the coupon index version
 
+def reserve_coupon_use(db:Session,code:str,commit=True):
+  # Single conditional UPDATE: concurrent checkouts can never push used past no_of_access
+  coupon_id = db.execute(
+    update(Coupon)
+    .where(Coupon.code == code,Coupon.visible == True,Coupon.used < Coupon.no_of_access)
+    .values(used=Coupon.used + 1,updated_at=Coupon.updated_at)
+    .returning(Coupon.id)
+    .execution_options(synchronize_session=False)
+  ).scalar_one_or_none()
+  if commit:
+    db.commit()
+  return coupon_id is not None
+
+def release_coupon_use(db:Session,code:str,count:int=1,commit=True):
+  db.execute(
+    update(Coupon)
+    .where(Coupon.code == code,Coupon.used > 0)
+    .values(used=func.greatest(Coupon.used - count,0),updated_at=Coupon.updated_at)
+    .execution_options(synchronize_session=False)
+  )
+  if commit:
+    db.commit()
+
+def redeem_coupon_use(db:Session,code:str):
+  # A payment that succeeded after its reservation was released still counts, even past the limit
+  db.execute(
+    update(Coupon)
+    .where(Coupon.code == code)
+    .values(used=Coupon.used + 1,updated_at=Coupon.updated_at)
+    .execution_options(synchronize_session=False)
+  )
+
+def release_expired_coupon_reservations(db:Session,ttl_minutes:int):
+  """Give back the uses held by checkouts that were never paid.
+
+  The processing rows are kept so a late successful payment can still be
+  fulfilled; it then redeems the coupon use directly.
+  """
+  cutoff = datetime.now(timezone.utc) - timedelta(minutes=ttl_minutes)
+  codes = db.execute(
+    update(TransactionProcessing)
+    .where(TransactionProcessing.coupon_reserved == True,TransactionProcessing.created_at < cutoff)
+    .values(coupon_reserved=False)
+    .returning(TransactionProcessing.coupon_code)
+    .execution_options(synchronize_session=False)
+  ).scalars().all()
+  for code,count in Counter(codes).items():
+    release_coupon_use(db,code,count,commit=False)
+  db.commit()
+  return len(codes)
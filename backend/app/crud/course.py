@@ -5,22 +5,23 @@ from .utils import *
 from schemas.course import CourseResponse
 from models.user import User
 from sqlalchemy import or_
-async def upload_thumbnail(file: UploadFile):
+from crud.search import apply_search
+def upload_thumbnail(file: UploadFile):
     folder = "course/thumbnail"
-    return await upload_file(file,folder)
-async def upload_landing_thumbnail(file: UploadFile):
+    return upload_file(file,folder)
+def upload_landing_thumbnail(file: UploadFile):
     folder = "course/landing-thumbnail"
-    return await upload_file(file,folder)
-async def upload_intro_video(file: UploadFile):
+    return upload_file(file,folder)
+def upload_intro_video(file: UploadFile):
     folder = "course/intro"
-    return await upload_file(file,folder)
+    return upload_file(file,folder)
 
-async def upload_video(file: UploadFile):
+def upload_video(file: UploadFile):
     folder = "course/chapter"
-    return await upload_file(file,folder)
-async def upload_pdf(file: UploadFile):
+    return upload_file(file,folder)
+def upload_pdf(file: UploadFile):
     folder = "course/chapter-pdf"
-    return await upload_file(file,folder)
+    return upload_file(file,folder)
 
 
 def get_course_by_id(db:Session,course_id:int,is_admin:bool=False):
@@ -35,13 +36,7 @@ def get_course_chapter_by_id(db:Session,course_chapter_id:int):
 def get_list_of_courses(db: Session, page: int = 1, limit: int = 10, search: str = None):
     query = db.query(Course)
 
-    if search:
-        query = query.filter(
-            or_(
-                Course.title.ilike(f"%{search}%"),
-                Course.description.ilike(f"%{search}%")
-            )
-        )
+    query = apply_search(query, Course, search)
 
     query = query.order_by(Course.created_at.desc())
 
@@ -69,38 +64,38 @@ def delete_course(db:Session,db_course:Course):
     db.commit()
     return {'detail':"Course deleted successfully"}
 
-async def delete_course_files(db_course:Course):
+def delete_course_files(db_course:Course):
     # delete course thumbnail
-    await delete_file(db_course.thumbnail)
+    delete_file(db_course.thumbnail)
     for chapter in db_course.chapters:
-        await delete_file(chapter.video)
+        delete_file(chapter.video)
 
-async def update_thumbnail_file(thumbnail,db_course:Course):
-    await delete_file(db_course.thumbnail)
-    file_url = await upload_thumbnail(thumbnail)
+def update_thumbnail_file(thumbnail,db_course:Course):
+    delete_file(db_course.thumbnail)
+    file_url = upload_thumbnail(thumbnail)
     return file_url
-async def update_landing_thumbnail_file(thumbnail,db_landing_page:CourseLandingPage):
-    await delete_file(db_landing_page.thumbnail)
-    file_url = await upload_landing_thumbnail(thumbnail)
+def update_landing_thumbnail_file(thumbnail,db_landing_page:CourseLandingPage):
+    delete_file(db_landing_page.thumbnail)
+    file_url = upload_landing_thumbnail(thumbnail)
     return file_url
 
-async def update_into_video_file(intro_video,db_course:Course):
-    await delete_file(db_course.intro_video)
-    file_url = await upload_intro_video(intro_video)
+def update_into_video_file(intro_video,db_course:Course):
+    delete_file(db_course.intro_video)
+    file_url = upload_intro_video(intro_video)
     return file_url
 
 
-async def update_video_file(video,db_course_chapter:CourseChapter):
+def update_video_file(video,db_course_chapter:CourseChapter):
     if not video: return
-    await delete_file(db_course_chapter.video)
-    file_url = await upload_video(video)
+    delete_file(db_course_chapter.video)
+    file_url = upload_video(video)
     return file_url
 
-async def update_pdf_file(pdf,db_course_chapter:CourseChapter):
+def update_pdf_file(pdf,db_course_chapter:CourseChapter):
     if not pdf : return
     if db_course_chapter.pdf:
-        await delete_file(db_course_chapter.pdf)
-    file_url = await upload_pdf(pdf)
+        delete_file(db_course_chapter.pdf)
+    file_url = upload_pdf(pdf)
     return file_url
 
 
@@ -7,45 +7,46 @@ from fastapi import UploadFile
 from .utils import delete_file,upload_file
 from core.config import settings
 from crud.utils import to_pagination_response
+from crud.search import apply_search
 from models.user import User
-async def upload_thumbnail(thumbnail:UploadFile):
+def upload_thumbnail(thumbnail:UploadFile):
     folder ='ebook/thumbnail'
-    return await upload_file(thumbnail,folder)
-async def upload_intro_video(thumbnail:UploadFile):
+    return upload_file(thumbnail,folder)
+def upload_intro_video(thumbnail:UploadFile):
     folder ='ebook/intro'
-    return await upload_file(thumbnail,folder)
-async def upload_landing_thumbnail(thumbnail:UploadFile):
+    return upload_file(thumbnail,folder)
+def upload_landing_thumbnail(thumbnail:UploadFile):
     folder = "ebook/landing-thumbnail"
-    return await upload_file(thumbnail,folder)
+    return upload_file(thumbnail,folder)
 
-async def upload_pdf_file(file:UploadFile):
+def upload_pdf_file(file:UploadFile):
     folder ='ebook/pdf'
-    return await upload_file(file,folder)
+    return upload_file(file,folder)
 
 
-async def update_thumbnail_file(thumbnail,db_ebook:EBook):
-    await delete_file(db_ebook.thumbnail)
-    file_url = await upload_thumbnail(thumbnail)
+def update_thumbnail_file(thumbnail,db_ebook:EBook):
+    delete_file(db_ebook.thumbnail)
+    file_url = upload_thumbnail(thumbnail)
     return file_url
-async def update_landing_thumbnail_file(thumbnail,db_landing_page:EBookLandingPage):
-    await delete_file(db_landing_page.thumbnail)
-    file_url = await upload_landing_thumbnail(thumbnail)
+def update_landing_thumbnail_file(thumbnail,db_landing_page:EBookLandingPage):
+    delete_file(db_landing_page.thumbnail)
+    file_url = upload_landing_thumbnail(thumbnail)
     return file_url
 
-async def update_intro_video_file(intro_video,db_ebook:EBook):
-    await delete_file(db_ebook.intro_video)
-    file_url = await upload_intro_video(intro_video)
+def update_intro_video_file(intro_video,db_ebook:EBook):
+    delete_file(db_ebook.intro_video)
+    file_url = upload_intro_video(intro_video)
     return file_url
 
-async def update_pdf_file(pdf,db_ebook:EBook):
-    await delete_file(db_ebook.pdf)
-    file_url = await upload_pdf_file(pdf)
+def update_pdf_file(pdf,db_ebook:EBook):
+    delete_file(db_ebook.pdf)
+    file_url = upload_pdf_file(pdf)
     return file_url
 
 
-async def delete_ebook_files(db_ebook:EBook):
-    await delete_file(db_ebook.pdf)
-    await delete_file(db_ebook.thumbnail)
+def delete_ebook_files(db_ebook:EBook):
+    delete_file(db_ebook.pdf)
+    delete_file(db_ebook.thumbnail)
 
 
 
@@ -53,13 +54,7 @@ async def delete_ebook_files(db_ebook:EBook):
 def get_list_of_ebooks(db: Session, page: int = 1, limit: int = 10, search: str = None):
     query = db.query(EBook)
 
-    if search:
-        query = query.filter(
-            or_(
-                EBook.title.ilike(f"%{search}%"),
-                EBook.description.ilike(f"%{search}%")
-            )
-        )
+    query = apply_search(query, EBook, search)
 
     query = query.order_by(EBook.created_at.desc())
 
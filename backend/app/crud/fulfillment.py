@@ -0,0 +1,79 @@
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from models.purchase import TransactionProcessing, Transaction, Purchase
+from schemas.user import UserCreate
+from crud.auth import create_user, create_affiliate_account, get_temp_user_by_id
+from crud.purchase import create_purchase
+from crud.coupon_code import redeem_coupon_use
+from crud.affiliate import (
+    get_affiliate_account_by_user_id,
+    add_purchase_commission_to_affiliate_account,
+    get_affiliate_link_by_all,
+    add_purchase_to_affiliate_link,
+)
+from crud.user_dashboard import get_item_by_id_and_type, invalidate_affiliate_dashboard
+from lib.dashboard_refresher import dashboard_refresher
+
+
+def lock_order(db: Session, order_id: str):
+    # Transaction-scoped advisory lock: concurrent events for one order run one after another
+    db.execute(select(func.pg_advisory_xact_lock(func.hashtext(f"order:{order_id}"))))
+
+def _promote_temp_user(db: Session, db_transaction_processing: TransactionProcessing):
+    temp_user = get_temp_user_by_id(db, db_transaction_processing.user_id)
+    user = create_user(
+        db,
+        UserCreate(
+            email=temp_user.email,
+            password=temp_user.password,
+            name=temp_user.name,
+            phone=temp_user.phone
+        ),
+        is_hashed_pw=True,
+        commit=False)
+    create_affiliate_account(db, user.id, commit=False)
+    db_transaction_processing.user_id = user.id
+    return temp_user
+
+def _credit_affiliate(db: Session, db_transaction_processing: TransactionProcessing):
+    db_item = get_item_by_id_and_type(db, db_transaction_processing.item_id, db_transaction_processing.item_type)
+    affiliate_account = get_affiliate_account_by_user_id(db, db_transaction_processing.affiliate_user_id)
+    if affiliate_account:
+        add_purchase_commission_to_affiliate_account(db,affiliate_account,db_item.commission,commit=False)
+    db_affiliate_link = get_affiliate_link_by_all(db,db_transaction_processing.affiliate_user_id,db_transaction_processing.item_id, db_transaction_processing.item_type)
+    if db_affiliate_link:
+        add_purchase_to_affiliate_link(db,db_affiliate_link,db_item.commission,commit=False)
+
+def fulfill_order(db: Session, db_transaction_processing: TransactionProcessing, db_transaction: Transaction | None = None):
+    """Deliver a paid order inside the caller's transaction and return (purchase, note).
+
+    Promotes the temp user, credits the affiliate, settles the coupon use,
+    creates the purchase and removes the processing row, flushing but never committing, so the caller
+    commits the whole sale once. The affiliate credit runs in a savepoint:
+    if it fails the buyer still gets the item and `note` says why.
+    """
+    note = None
+    temp_user = None
+    if db_transaction_processing.is_new_user:
+        temp_user = _promote_temp_user(db, db_transaction_processing)
+    if db_transaction_processing.affiliate_user_id:
+        try:
+            with db.begin_nested():
+                _credit_affiliate(db, db_transaction_processing)
+        except Exception as e:
+            note = f"Affiliate credit skipped: {type(e).__name__}: {e}"
+    if db_transaction_processing.coupon_code and not db_transaction_processing.coupon_reserved:
+        # The reservation expired before payment; count the use now
+        redeem_coupon_use(db, db_transaction_processing.coupon_code)
+    purchase = create_purchase(db, db_transaction_processing, commit=False)
+    purchase.transaction = db_transaction
+    db.delete(db_transaction_processing)
+    if temp_user:
+        db.delete(temp_user)
+    db.flush()
+    return purchase, note
+
+def after_fulfillment(affiliate_user_id: int | None):
+    # Post-commit cache and snapshot invalidation
+    invalidate_affiliate_dashboard(affiliate_user_id)
+    dashboard_refresher.request_refresh()
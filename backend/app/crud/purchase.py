@@ -4,7 +4,11 @@ import hmac
 import hashlib
 from datetime import datetime
 from crud.utils import to_pagination_response
-from schemas.purchase import TransactionResponse,PurchaseResponse,ListTransactionResponse
+from schemas.purchase import TransactionResponse,PurchaseResponse,ListTransactionResponse,PurchaseItemResponse
+from models.course import Course
+from models.ebook import EBook
+from sqlalchemy.orm import joinedload,load_only
+from collections import defaultdict
 from sqlalchemy import or_
 from models.user import User
 from schemas.ebook import EBookResponse
@@ -46,14 +50,21 @@ def verify_razorpay_signature(payload: bytes, received_signature: str, secret: s
 
     return hmac.compare_digest(generated_signature, received_signature)
 
+def to_amount(value) -> float | None:
+    # TransactionProcessing keeps amounts as strings
+    if value is None or value == '':
+        return None
+    return float(value)
+
 def create_purchase(db: Session, data: dict, commit=True):
     create_data = {
         'purchased_user_id':data.user_id if data.user_id else None,
         'item_id':data.item_id,
         'item_type':data.item_type,
         'affiliate_user_id':data.affiliate_user_id if data.affiliate_user_id else None,
-        "amount": data.amount if hasattr(data, 'amount') else None,
-        "discount": data.discount if hasattr(data, 'discount') else None,
+        # amount is the item price at checkout, discount the coupon reduction; both feed revenue reports
+        "amount": to_amount(data.amount) if hasattr(data, 'amount') else None,
+        "discount": to_amount(data.discount) if hasattr(data, 'discount') else None,
         "coupon_code": data.coupon_code if hasattr(data, 'coupon_code') else None,
         "coupon_type":data.coupon_type if hasattr(data, 'coupon_type') else None,
     }
@@ -64,11 +75,9 @@ def create_purchase(db: Session, data: dict, commit=True):
         db.refresh(purchase)
     return purchase
 
-def create_razorpay_transaction(db: Session, transaction_id: str, db_purchase: Purchase | None, txn_data: dict, commit=True):
+def create_razorpay_transaction(db: Session, transaction_id: str, txn_data: dict, item_id: int | None = None, item_type: str | None = None, commit=True):
     transaction = Transaction(
-        purchase_id=db_purchase.id if db_purchase else None,
         transaction_id=transaction_id,
-        order_id=txn_data.get("order_id"),  # Make sure to save order_id
         status=txn_data.get("status"),
         provider="razorpay",
         utr_id=txn_data.get("acquirer_data", {}).get("rrn"),
@@ -83,7 +92,9 @@ def create_razorpay_transaction(db: Session, transaction_id: str, db_purchase: P
         tax=txn_data.get("tax"),
         error_code=txn_data.get("error_code"),
         error_description=txn_data.get("error_description"),
-        created_at=datetime.utcnow()
+        created_at=datetime.utcnow(),
+        item_id=item_id,
+        item_type=item_type
     )
     db.add(transaction)
     if commit:
@@ -91,6 +102,23 @@ def create_razorpay_transaction(db: Session, transaction_id: str, db_purchase: P
         db.refresh(transaction)
     return transaction
 
+def update_razorpay_transaction(db: Session, db_transaction: Transaction, txn_data: dict, commit=True):
+    # Later events for the same payment (authorized -> captured/failed) carry the newer state
+    db_transaction.status = txn_data.get("status")
+    db_transaction.utr_id = txn_data.get("acquirer_data", {}).get("rrn") or db_transaction.utr_id
+    db_transaction.method = txn_data.get("method")
+    db_transaction.vpa = txn_data.get("upi", {}).get("vpa") or db_transaction.vpa
+    db_transaction.amount = txn_data.get("amount")
+    db_transaction.base_amount = txn_data.get("base_amount")
+    db_transaction.fee = txn_data.get("fee")
+    db_transaction.tax = txn_data.get("tax")
+    db_transaction.error_code = txn_data.get("error_code")
+    db_transaction.error_description = txn_data.get("error_description")
+    if commit:
+        db.commit()
+        db.refresh(db_transaction)
+    return db_transaction
+
 def create_cashfree_transaction(
     db: Session,
     transaction_id: str,
@@ -191,6 +219,16 @@ def get_purchase_by_user_id_and_item_id_and_type(db: Session, user_id: int, item
         Purchase.item_type == item_type
     ).first()
 
+def get_purchased_item_ids(db: Session, user_id: int, item_type: str, item_ids: list):
+    if not item_ids:
+        return set()
+    rows = db.query(Purchase.item_id).filter(
+        Purchase.purchased_user_id == user_id,
+        Purchase.item_type == item_type,
+        Purchase.item_id.in_(item_ids)
+    ).all()
+    return {row.item_id for row in rows}
+
 def delete_purchase(db: Session, purchase_id: int):
     purchase = get_purchase(db, purchase_id)
     if not purchase:
@@ -211,25 +249,25 @@ def get_item_by_id_and_type(db: Session, item_id: int, item_type: str):
     
 
 
-def get_all_transactions(db:Session,page:int=1,limit:int=10,search:str=''):
+def get_all_transactions(db:Session,page:int=1,limit:int=10,search:str='',cursor:str|None=None,count:str='exact'):
     query = db.query(Transaction).order_by(Transaction.created_at.desc())
     if search:
         print('enter') 
         query = query.filter(or_(Transaction.transaction_id.like(f"%{search}%"),Transaction.order_id.like(f"%{search}%")))
-    return to_pagination_response(query,TransactionResponse,page,limit)
+    return to_pagination_response(query,TransactionResponse,page,limit,cursor,count)
 
-def get_success_transactions(db:Session,page:int=1,limit:int=10,search:str=''):
+def get_success_transactions(db:Session,page:int=1,limit:int=10,search:str='',cursor:str|None=None,count:str='exact'):
     query = db.query(Transaction).filter(Transaction.status == "captured").order_by(Transaction.created_at.desc())
     if search:
         print('enter')
         query = query.filter(or_(Transaction.transaction_id.like(f"%{search}%"),Transaction.order_id.like(f"%{search}%")))
-    return to_pagination_response(query,TransactionResponse,page,limit)
+    return to_pagination_response(query,TransactionResponse,page,limit,cursor,count)
 
-def get_failed_transactions(db:Session,page:int=1,limit:int=10,search:str=''):
+def get_failed_transactions(db:Session,page:int=1,limit:int=10,search:str='',cursor:str|None=None,count:str='exact'):
     query = db.query(Transaction).filter(Transaction.status == "failed").order_by(Transaction.created_at.desc())
     if search:
         query = query.filter(or_(Transaction.transaction_id.like(f"%{search}%"),Transaction.order_id.like(f"%{search}%")))
-    return to_pagination_response(query,TransactionResponse,page,limit)
+    return to_pagination_response(query,TransactionResponse,page,limit,cursor,count)
 
 def get_transaction_by_id(db:Session,transaction_id:str):
     return db.query(Transaction).filter(Transaction.id == transaction_id).first()
@@ -240,7 +278,9 @@ def get_purchases(
     limit: int = 10,
     search: str = '',
     item_type: str | None = None,
-    dummy: bool = False
+    dummy: bool = False,
+    cursor: str | None = None,
+    count: str = 'exact'
 ):
     query = db.query(Purchase)
 
@@ -258,34 +298,51 @@ def get_purchases(
             )
         )
 
-    query = query.order_by(Purchase.created_at.desc())
-    data = to_pagination_response(query, PurchaseResponse, page, limit)
+    query = query.options(
+        joinedload(Purchase.transaction),
+        joinedload(Purchase.user),
+        joinedload(Purchase.affiliate_user),
+    ).order_by(Purchase.created_at.desc())
+    data = to_pagination_response(query, PurchaseResponse, page, limit, cursor, count)
 
     items = data.get('items', [])
-    for i, item in enumerate(items):
-        db_item = get_item_by_id_and_type(db, item.get('item_id'), item.get('item_type'))
+    page_items = get_purchase_items(db, [(item.get('item_type'), item.get('item_id')) for item in items])
+    for item in items:
+        db_item = page_items.get((item.get('item_type'), item.get('item_id')))
         if db_item:
-            if item.get('item_type') == "ebook":
-                items[i]['item'] = EBookResponse.from_orm(db_item)
-            elif item.get('item_type') == "course":
-                items[i]['item'] = CourseResponse.from_orm(db_item)
-        if item.get('transaction'):
-            item['transaction']  =ListTransactionResponse.from_orm(item.get('transaction'))
+            item['item'] = PurchaseItemResponse.from_orm(db_item)
     data['items'] = items
     return data
 
+PURCHASE_ITEM_MODELS = {'course': Course, 'ebook': EBook}
+
+def get_purchase_items(db: Session, keys: list) -> dict:
+    """Load the items behind (item_type, item_id) pairs with one IN query per type."""
+    ids_by_type = defaultdict(set)
+    for item_type, item_id in keys:
+        if item_type in PURCHASE_ITEM_MODELS:
+            ids_by_type[item_type].add(item_id)
+    items = {}
+    for item_type, ids in ids_by_type.items():
+        model = PURCHASE_ITEM_MODELS[item_type]
+        rows = db.query(model).options(
+            load_only(model.id, model.title, model.description, model.price, model.commission, model.thumbnail)
+        ).filter(model.id.in_(ids)).all()
+        items.update({(item_type, row.id): row for row in rows})
+    return items
+
 
-def get_all_purchases(db: Session, page: int = 1, limit: int = 10, search: str = ''):
-    return get_purchases(db, page, limit, search)
+def get_all_purchases(db: Session, page: int = 1, limit: int = 10, search: str = '', cursor: str | None = None, count: str = 'exact'):
+    return get_purchases(db, page, limit, search, cursor=cursor, count=count)
 
-def get_all_ebook_purchases(db: Session, page: int = 1, limit: int = 10, search: str = ''):
-    return get_purchases(db, page, limit, search, item_type='ebook')
+def get_all_ebook_purchases(db: Session, page: int = 1, limit: int = 10, search: str = '', cursor: str | None = None, count: str = 'exact'):
+    return get_purchases(db, page, limit, search, item_type='ebook', cursor=cursor, count=count)
 
-def get_all_course_purchases(db: Session, page: int = 1, limit: int = 10, search: str = ''):
-    return get_purchases(db, page, limit, search, item_type='course')
+def get_all_course_purchases(db: Session, page: int = 1, limit: int = 10, search: str = '', cursor: str | None = None, count: str = 'exact'):
+    return get_purchases(db, page, limit, search, item_type='course', cursor=cursor, count=count)
 
-def get_all_dummy_purchases(db: Session, page: int = 1, limit: int = 10, search: str = ''):
-    return get_purchases(db, page, limit, search, dummy=True)
+def get_all_dummy_purchases(db: Session, page: int = 1, limit: int = 10, search: str = '', cursor: str | None = None, count: str = 'exact'):
+    return get_purchases(db, page, limit, search, dummy=True, cursor=cursor, count=count)
 
 
 def get_purchase_by_all(
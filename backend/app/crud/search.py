@@ -0,0 +1,23 @@
+from sqlalchemy import or_, func
+from models.utils import SEARCH_CONFIG
+
+def search_tsquery(term: str):
+    return func.websearch_to_tsquery(SEARCH_CONFIG, term)
+
+def search_clause(model, term: str):
+    # The tsvector match and the substring fallbacks are each backed by a GIN index
+    pattern = f"%{term}%"
+    return or_(
+        model.search_vector.op('@@')(search_tsquery(term)),
+        model.title.ilike(pattern),
+        model.description.ilike(pattern),
+    )
+
+def search_rank(model, term: str):
+    return func.ts_rank_cd(model.search_vector, search_tsquery(term)) + func.similarity(model.title, term)
+
+def apply_search(query, model, term: str | None):
+    term = (term or '').strip()
+    if not term:
+        return query
+    return query.filter(search_clause(model, term)).order_by(search_rank(model, term).desc())
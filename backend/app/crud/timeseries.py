@@ -0,0 +1,57 @@
+from sqlalchemy import select, func, cast, DateTime, literal_column
+from sqlalchemy.orm import Session
+
+# to_char format of the bucket label for each supported granularity
+GRANULARITY_FORMATS = {
+    'day': 'YYYY-MM-DD',
+    'week': 'YYYY-MM-DD',
+    'month': 'YYYY-MM',
+}
+
+def shift_months(moment, months: int):
+    """First day of the month that is `months` away from `moment`."""
+    month_index = moment.year * 12 + moment.month - 1 + months
+    return moment.replace(year=month_index // 12, month=month_index % 12 + 1, day=1)
+
+def time_series(
+    db: Session,
+    time_column,
+    values: dict,
+    start,
+    end,
+    granularity: str = 'day',
+    where: list = (),
+    select_from=None,
+):
+    """Gap-filled aggregates per bucket from start to end (both buckets included), oldest first.
+
+    `values` maps output names to aggregate expressions, e.g. {'earnings': func.sum(X.amount)}.
+    Each returned row has a `bucket` label plus one column per value; empty buckets are 0.
+    start/end are naive UTC datetimes or dates.
+    """
+    if granularity not in GRANULARITY_FORMATS:
+        raise ValueError(f"Unsupported granularity '{granularity}'")
+    step = literal_column(f"interval '1 {granularity}'")
+    first_bucket = func.date_trunc(granularity, cast(start, DateTime))
+    last_bucket = func.date_trunc(granularity, cast(end, DateTime))
+    bucket = cast(func.date_trunc(granularity, time_column), DateTime)
+
+    aggregated = select(bucket.label('bucket'), *[expr.label(name) for name, expr in values.items()])
+    if select_from is not None:
+        aggregated = aggregated.select_from(select_from)
+    # Bounds are cast to the column's own type so an index on it stays usable
+    aggregated = aggregated.where(
+        time_column >= cast(first_bucket, time_column.type),
+        time_column < cast(last_bucket + step, time_column.type),
+        *where
+    ).group_by(bucket).subquery('aggregated')
+
+    series = select(func.generate_series(first_bucket, last_bucket, step).label('bucket')).subquery('series')
+
+    stmt = select(
+        func.to_char(series.c.bucket, GRANULARITY_FORMATS[granularity]).label('bucket'),
+        *[func.coalesce(aggregated.c[name], 0).label(name) for name in values]
+    ).select_from(
+        series.outerjoin(aggregated, aggregated.c.bucket == series.c.bucket)
+    ).order_by(series.c.bucket)
+    return db.execute(stmt).all()
@@ -7,149 +7,166 @@ from models.user import User
 from models.purchase import Purchase
 from schemas.course import CourseListResponse
 from schemas.ebook import EbookListResponse
-from crud.affiliate import get_affiliate_link_by_all
+from crud.affiliate import get_affiliate_link_by_all,get_affiliate_linked_item_ids
 from crud.affiliate import AffiliateAccount
-from models.affiliate import AffiliateLinkPurchase,AffiliateLinkClick
+from crud.affiliate import get_total_earnings,get_total_clicks,get_total_purchases,find_conversion_rate,get_total_active_links
+from models.affiliate import AffiliateLinkPurchase,AffiliateLinkClick,AffiliateLinkDailyStats
 from datetime import datetime, timedelta
 from sqlalchemy import func
-from crud.purchase import get_item_by_id_and_type
+from crud.purchase import get_item_by_id_and_type,get_purchased_item_ids
 from models.affiliate import Withdraw
 from schemas.affiliate import WithdrawResponse
 from datetime import datetime, timedelta, timezone
 from crud.affiliate import get_affiliate_account_by_id
 from sqlalchemy import desc  # if you want descending order
 from crud.utils import to_pagination_response
+from crud.search import apply_search,search_clause,search_rank
 from models.affiliate import UPIDetails,BankDetails
 from schemas.affiliate import UPIDetailsResponse,BankAccountResponse
 from crud.course import get_or_create_course_progress
 from typing import Type, Union
-from sqlalchemy import or_
-def get_user_purchased_course_and_ebook(db: Session, user: User,page: int = 1, limit: int = 10):
-    user_purchases = user.purchases
+from sqlalchemy import or_, and_, select, literal, union_all, String, join
+from crud.timeseries import time_series,shift_months
+from fastapi.encoders import jsonable_encoder
+from core.cache import cache
+from core.config import settings
+from models.affiliate import AffiliateLink
+import math
+LIBRARY_SCHEMAS = {
+    'course': (Course, CourseListResponse),
+    'ebook': (EBook, EbookListResponse),
+}
+
+def _library_select(user: User, item_type: str, search: str = None):
+    model, _ = LIBRARY_SCHEMAS[item_type]
+    stmt = select(
+        literal(item_type, String).label('type'),
+        model.id.label('id'),
+        model.title.label('title'),
+        model.description.label('description'),
+        model.is_featured.label('is_featured'),
+        model.is_new.label('is_new'),
+        model.price.label('price'),
+        model.thumbnail.label('thumbnail'),
+        Purchase.created_at.label('purchased_at'),
+        AffiliateLink.id.isnot(None).label('has_affiliate_link'),
+    ).select_from(model).join(
+        Purchase,
+        and_(Purchase.item_id == model.id, Purchase.item_type == item_type)
+    ).outerjoin(
+        AffiliateLink,
+        and_(
+            AffiliateLink.user_id == user.id,
+            AffiliateLink.item_id == model.id,
+            AffiliateLink.item_type == item_type
+        )
+    ).where(
+        Purchase.purchased_user_id == user.id,
+        model.visible.is_(True)
+    )
+    search = (search or '').strip()
+    if search:
+        stmt = stmt.where(search_clause(model, search))
+    return stmt
+
+def get_user_library(db: Session, user: User, item_types=('course', 'ebook'), page: int = 1, limit: int = 10, search: str = None):
+    # One row per purchase, newest first; the count and the page are the only two queries
+    selects = [_library_select(user, item_type, search) for item_type in item_types]
+    library = (union_all(*selects) if len(selects) > 1 else selects[0]).subquery()
+
+    total = db.execute(select(func.count()).select_from(library)).scalar()
+    rows = db.execute(
+        select(library)
+        .order_by(library.c.purchased_at.desc(), library.c.id.desc())
+        .offset((page - 1) * limit)
+        .limit(limit)
+    ).all()
+
     res = []
-    for purchase in user_purchases:
-        if purchase.item_type == 'course':
-            course = db.query(Course).filter(Course.id == purchase.item_id,Course.visible==True).first()
-            if course:
-                course_data = CourseListResponse.from_orm(course).dict()
-                course_data['type'] = 'course'
-                course_data['purchased_at'] = purchase.created_at
-                course_data['is_purchased'] = True
-                course_data['has_affiliate_link'] = get_affiliate_link_by_all(
-                    db, user.id, course.id, 'course'
-                ) is not None
-
-                res.append(course_data)
-        elif purchase.item_type == 'ebook':
-            ebook = db.query(EBook).filter(EBook.id == purchase.item_id,EBook.visible==True).first()
-            if ebook:
-                ebook_data = EbookListResponse.from_orm(ebook).dict()
-                ebook_data['type'] = 'ebook'
-                ebook_data['purchased_at'] = purchase.created_at
-                ebook_data['is_purchased'] = True
-                ebook_data['has_affiliate_link'] = get_affiliate_link_by_all(
-                    db, user.id, ebook.id, 'ebook'
-                ) is not None
-                res.append(ebook_data)
-    # sort by purchased_at date
-    res.sort(key=lambda x:x['purchased_at'], reverse=True)
-    # pagination
-    total = len(res)
-    start = (page - 1) * limit
-    end = start + limit
-    paginated_items = res[start:end] 
+    for row in rows:
+        _, response_schema = LIBRARY_SCHEMAS[row.type]
+        item_data = response_schema.from_orm(row).dict()
+        item_data['type'] = row.type
+        item_data['purchased_at'] = row.purchased_at
+        item_data['is_purchased'] = True
+        item_data['has_affiliate_link'] = row.has_affiliate_link
+        res.append(item_data)
+
     return {
         "has_prev": page > 1,
-        "has_next": end < total,
+        "has_next": page * limit < total,
         "total": total,
-        "items": paginated_items
+        "items": res
     }
 
-def get_user_purchased_courses(db: Session, user: User, page: int = 1, limit: int = 10, search: str = None):
-    user_purchases = user.purchases
-    res = []
-    
-    for purchase in user_purchases:
-        if purchase.item_type == 'course':
-            course = db.query(Course).filter(
-                Course.id == purchase.item_id,
-                Course.visible == True
-            ).first()
-
-            if course:
-                # Apply search filter if needed
-                if search:
-                    search_lower = search.lower()
-                    if search_lower not in course.title.lower() and search_lower not in course.description.lower():
-                        continue
-                
-                course_data = CourseListResponse.from_orm(course).dict()
-                course_data['type'] = 'course'
-                course_data['purchased_at'] = purchase.created_at
-                course_data['is_purchased'] = True
-                course_data['has_affiliate_link'] = get_affiliate_link_by_all(
-                    db, user.id, course.id, 'course'
-                ) is not None
-                res.append(course_data)
-    
-    # Sort by purchased_at date (newest first)
-    res.sort(key=lambda x: x['purchased_at'], reverse=True)
-    
-    # Paginate
-    total = len(res)
-    start = (page - 1) * limit
-    end = start + limit
-    paginated_items = res[start:end]
-    
+def _catalog_select(item_type: str, search: str = None):
+    model, _ = LIBRARY_SCHEMAS[item_type]
+    search = (search or '').strip()
+    rank = search_rank(model, search) if search else literal(0.0)
+    stmt = select(
+        literal(item_type, String).label('type'),
+        model.id.label('id'),
+        model.title.label('title'),
+        model.description.label('description'),
+        model.price.label('price'),
+        model.commission.label('commission'),
+        model.thumbnail.label('thumbnail'),
+        model.intro_video.label('intro_video'),
+        model.created_at.label('created_at'),
+        rank.label('rank'),
+    ).where(model.visible.is_(True))
+    if search:
+        stmt = stmt.where(search_clause(model, search))
+    return stmt
+
+def get_catalog_items(db: Session, item_types=('course', 'ebook'), page: int = 1, limit: int = 10, search: str = None):
+    # Courses and ebooks ranked together in SQL; the count and the page are the only two queries
+    selects = [_catalog_select(item_type, search) for item_type in item_types]
+    catalog = (union_all(*selects) if len(selects) > 1 else selects[0]).subquery()
+
+    total = db.execute(select(func.count()).select_from(catalog)).scalar()
+    rows = db.execute(
+        select(catalog)
+        .order_by(catalog.c.rank.desc(), catalog.c.created_at.desc(), catalog.c.id.desc())
+        .offset((page - 1) * limit)
+        .limit(limit)
+    ).all()
+    items = [{
+        "id": row.id,
+        "title": row.title,
+        "description": row.description,
+        "price": row.price,
+        "commission": row.commission,
+        "thumbnail": row.thumbnail,
+        "intro_video": row.intro_video,
+        "type": row.type,
+    } for row in rows]
     return {
-        "has_prev": page > 1,
-        "has_next": end < total,
         "total": total,
-        "items": paginated_items
+        "limit": limit,
+        "total_pages": math.ceil(total / limit) if limit else 1,
+        "has_prev": page > 1,
+        "has_next": page * limit < total,
+        "items": items,
     }
 
-def get_user_purchased_ebooks(db: Session, user: User, page: int = 1, limit: int = 10, search: str = None):
-    user_purchases = user.purchases
-    res = []
+def get_user_purchased_course_and_ebook(db: Session, user: User, page: int = 1, limit: int = 10, search: str = None):
+    return get_user_library(db, user, ('course', 'ebook'), page, limit, search)
 
-    for purchase in user_purchases:
-        if purchase.item_type == 'ebook':
-            ebook = db.query(EBook).filter(
-                EBook.id == purchase.item_id,
-                EBook.visible == True
-            ).first()
+def get_user_purchased_courses(db: Session, user: User, page: int = 1, limit: int = 10, search: str = None):
+    return get_user_library(db, user, ('course',), page, limit, search)
 
-            if ebook:
-                # Apply search filter if provided
-                if search:
-                    search_lower = search.lower()
-                    if search_lower not in ebook.title.lower() and search_lower not in ebook.description.lower():
-                        continue
-
-                ebook_data = EbookListResponse.from_orm(ebook).dict()
-                ebook_data['type'] = 'ebook'
-                ebook_data['purchased_at'] = purchase.created_at
-                ebook_data['is_purchased'] = True
-                ebook_data['has_affiliate_link'] = get_affiliate_link_by_all(
-                    db, user.id, ebook.id, 'ebook'
-                ) is not None
-                res.append(ebook_data)
-
-    # Sort by purchase date (newest first)
-    res.sort(key=lambda x: x['purchased_at'], reverse=True)
-
-    # Pagination
-    total = len(res)
-    start = (page - 1) * limit
-    end = start + limit
-    paginated_items = res[start:end]
+def get_user_purchased_ebooks(db: Session, user: User, page: int = 1, limit: int = 10, search: str = None):
+    return get_user_library(db, user, ('ebook',), page, limit, search)
 
+def get_home_card(db: Session, user: User):
     return {
-        "has_prev": page > 1,
-        "has_next": end < total,
-        "total": total,
-        "items": paginated_items
+        "total_purchase":get_total_user_purchases(user),
+        "total_progressing_course":get_total_progressing_courses(db,user),
+        "total_ebooks":get_total_purchased_ebooks(user),
+        "total_courses":get_total_purchased_courses(user),
     }
+
 def get_total_user_purchases(user: User):
     return len(user.purchases)
 
@@ -204,46 +221,32 @@ def get_items(
         query = query.filter(model.is_new.is_(True))
     if is_featured:
         query = query.filter(model.is_featured.is_(True))
-    if search:
-        search_str = f"%{search.lower()}%"
-        query = query.filter(
-            or_(
-                model.title.ilike(search_str),
-                model.description.ilike(search_str)
-            )
-        )
+    query = apply_search(query, model, search)
 
-    items = query.all()
-    res = []
+    total = query.count()
+    items = query.order_by(model.created_at.desc(), model.id.desc()).offset((page - 1) * limit).limit(limit).all()
 
+    # Resolve both flags for the whole page with one IN query each
+    item_ids = [item.id for item in items]
+    if user.is_admin:
+        purchased_ids = set(item_ids)
+    else:
+        purchased_ids = get_purchased_item_ids(db, user.id, item_type, item_ids)
+    linked_ids = get_affiliate_linked_item_ids(db, user.id, item_type, item_ids)
+
+    res = []
     for item in items:
         item_data = response_schema.from_orm(item).dict()
         item_data["type"] = item_type
-        if user.is_admin:
-            item_data["is_purchased"] = True
-        else : 
-            item_data["is_purchased"] = db.query(Purchase).filter(
-                Purchase.item_type == item_type,
-                Purchase.item_id == item.id,
-                Purchase.purchased_user_id == user.id
-            ).first() is not None
-
-        item_data["has_affiliate_link"] = get_affiliate_link_by_all(
-            db, user.id, item.id, item_type
-        ) is not None
-
+        item_data["is_purchased"] = item.id in purchased_ids
+        item_data["has_affiliate_link"] = item.id in linked_ids
         res.append(item_data)
 
-    total = len(res)
-    start = (page - 1) * limit
-    end = start + limit
-    paginated_items = res[start:end]
-
     return {
         "has_prev": page > 1,
-        "has_next": end < total,
+        "has_next": page * limit < total,
         "total": total,
-        "items": paginated_items
+        "items": res
     }
 
 # Courses
@@ -266,125 +269,98 @@ def get_new_ebooks(db: Session, user: User, page=1, limit=10,search=None):
 def get_featured_ebooks(db: Session, user: User, page=1, limit=10,search=None):
     return get_items(db, user, EBook, EbookListResponse, 'ebook', page, limit, is_featured=True,search=search)
 
-def get_monthly_earnings(db: Session, user: User):
-    link_ids = [link.id for link in user.affiliate_links]
-    if not link_ids:
-        return []
-
-    twelve_months_ago = datetime.utcnow() - timedelta(days=365)
-    current_date = datetime.utcnow()
-
-    # Raw query results grouped by year and month
-    results = db.query(
-        func.extract('year', AffiliateLinkPurchase.created_at).label('year'),
-        func.extract('month', AffiliateLinkPurchase.created_at).label('month'),
-        func.sum(AffiliateLinkPurchase.amount).label('earnings')
-    ).filter(
-        AffiliateLinkPurchase.link_id.in_(link_ids),
-        AffiliateLinkPurchase.created_at >= twelve_months_ago
-    ).group_by('year', 'month').order_by('year', 'month').all()
-
-    # Build a dictionary of month -> earnings
-    earnings_map = {
-        f"{int(row.year):04d}-{int(row.month):02d}": float(row.earnings)
-        for row in results
-    }
-
-    # Build list of last 12 months in format YYYY-MM
-    monthly_earnings = []
-    for i in range(12):
-        month_date = current_date - timedelta(days=i * 30)  # Approximate each month as 30 days
-        year_month = month_date.strftime("%Y-%m")
-        monthly_earnings.append({
-            "month": year_month,
-            "earnings": earnings_map.get(year_month, 0.0)
-        })
-
-    # Ensure list is ordered from oldest to newest
-    monthly_earnings.reverse()
-
-    return monthly_earnings
-
-def get_click_conversion_week(db: Session, user: User):
-    link_ids = [link.id for link in user.affiliate_links]
-    last_week = datetime.utcnow() - timedelta(days=7)
-    current_date = datetime.utcnow()
-
-    purchases = db.query(
-        func.extract('day', AffiliateLinkPurchase.created_at).label('day'),
-        func.extract('year', AffiliateLinkPurchase.created_at).label('year'),
-        func.extract('month', AffiliateLinkPurchase.created_at).label('month'),
-        func.count(AffiliateLinkPurchase.amount).label('purchases'),
-        func.sum(AffiliateLinkPurchase.amount).label('earnings')
-    ).filter(
-        AffiliateLinkPurchase.link_id.in_(link_ids),
-        AffiliateLinkPurchase.created_at >= last_week
-    ).group_by('year', 'month', 'day').order_by('year', 'month', 'day').all()
-
-    purchases_dict = {
-        f"{int(p.year):04d}-{int(p.month):02d}-{int(p.day):02d}": {
-            "purchases": p.purchases,
-            "earnings": p.earnings
-        } for p in purchases
-    }
+def _user_daily_stats_series(db: Session, user: User, values: dict, start, end, granularity: str):
+    return time_series(
+        db,
+        AffiliateLinkDailyStats.day,
+        values,
+        start,
+        end,
+        granularity,
+        where=[AffiliateLink.user_id == user.id],
+        select_from=join(AffiliateLinkDailyStats, AffiliateLink, AffiliateLink.id == AffiliateLinkDailyStats.link_id),
+    )
+
+def get_monthly_earnings(db: Session, user: User, start=None, end=None, granularity: str = 'month'):
+    # Defaults to the last 12 calendar months, current month included
+    end = end or datetime.utcnow()
+    start = start or shift_months(end, -11)
+    rows = _user_daily_stats_series(
+        db, user, {'earnings': func.sum(AffiliateLinkDailyStats.earnings)}, start, end, granularity
+    )
+    return [{"month": row.bucket, "earnings": float(row.earnings)} for row in rows]
+
+def get_click_conversion_week(db: Session, user: User, start=None, end=None, granularity: str = 'day'):
+    # Defaults to the last 7 days including today
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=6)
+    rows = _user_daily_stats_series(db, user, {
+        'clicks': func.sum(AffiliateLinkDailyStats.clicks),
+        'purchases': func.sum(AffiliateLinkDailyStats.purchases),
+        'earnings': func.sum(AffiliateLinkDailyStats.earnings),
+    }, start, end, granularity)
+    return [{
+        "date": row.bucket,
+        "clicks": row.clicks,
+        "conversions": (row.purchases / row.clicks * 100) if row.clicks else 0.0,
+        "earnings": row.earnings,
+        "purchases": row.purchases
+    } for row in rows]
 
+def get_all_products(db: Session, user: User,query:str, page: int = 1, limit: int = 10):
+    # Per-link click and purchase totals, aggregated only over this user's links
     clicks = db.query(
-        func.extract('day', AffiliateLinkClick.created_at).label('day'),
-        func.extract('month', AffiliateLinkClick.created_at).label('month'),
-        func.extract('year', AffiliateLinkClick.created_at).label('year'),
+        AffiliateLinkClick.link_id,
         func.count(AffiliateLinkClick.id).label('clicks')
+    ).join(AffiliateLink, AffiliateLink.id == AffiliateLinkClick.link_id).filter(
+        AffiliateLink.user_id == user.id
+    ).group_by(AffiliateLinkClick.link_id).subquery()
+    purchases = db.query(
+        AffiliateLinkPurchase.link_id,
+        func.count(AffiliateLinkPurchase.id).label('purchases'),
+        func.sum(AffiliateLinkPurchase.amount).label('earnings')
+    ).join(AffiliateLink, AffiliateLink.id == AffiliateLinkPurchase.link_id).filter(
+        AffiliateLink.user_id == user.id
+    ).group_by(AffiliateLinkPurchase.link_id).subquery()
+
+    title = func.coalesce(Course.title, EBook.title)
+    products_query = db.query(
+        AffiliateLink.id,
+        AffiliateLink.item_id,
+        AffiliateLink.item_type,
+        title.label('name'),
+        func.coalesce(clicks.c.clicks, 0).label('clicks'),
+        func.coalesce(purchases.c.purchases, 0).label('purchases'),
+        func.coalesce(purchases.c.earnings, 0).label('earnings'),
+    ).outerjoin(
+        Course, and_(AffiliateLink.item_type == 'course', Course.id == AffiliateLink.item_id)
+    ).outerjoin(
+        EBook, and_(AffiliateLink.item_type == 'ebook', EBook.id == AffiliateLink.item_id)
+    ).outerjoin(
+        clicks, clicks.c.link_id == AffiliateLink.id
+    ).outerjoin(
+        purchases, purchases.c.link_id == AffiliateLink.id
     ).filter(
-        AffiliateLinkClick.link_id.in_(link_ids),
-        AffiliateLinkClick.created_at >= last_week
-    ).group_by('year', 'month', 'day').order_by('year', 'month', 'day').all()
+        AffiliateLink.user_id == user.id,
+        title.isnot(None)
+    )
+    if query:
+        products_query = products_query.filter(title.ilike(f"%{query}%"))
 
-    clicks_dict = {
-        f"{int(c.year):04d}-{int(c.month):02d}-{int(c.day):02d}": c.clicks for c in clicks
-    }
-
-    this_week_performance = []
-    for i in range(6, -1, -1):  # last 7 days including today
-        day_date = current_date - timedelta(days=i)
-        full_date = day_date.strftime("%Y-%m-%d")  # ✅ ISO format
-
-        clicks = clicks_dict.get(full_date, 0)
-        purchases_data = purchases_dict.get(full_date, {"purchases": 0, "earnings": 0})
-        conversions = (purchases_data["purchases"] / clicks * 100) if clicks else 0.0
-
-        this_week_performance.append({
-            "date": full_date,
-            "clicks": clicks,
-            "conversions": conversions,
-            "earnings": purchases_data["earnings"],
-            "purchases": purchases_data["purchases"]
-        })
-
-    return this_week_performance
+    total = products_query.count()
+    rows = products_query.order_by(AffiliateLink.id).offset((page - 1) * limit).limit(limit).all()
 
-def get_all_products(db: Session, user: User,query:str, page: int = 1, limit: int = 10):
-    links = user.affiliate_links
-    total = len(links)
-    start = (page - 1) * limit
-    end = start + limit
-    sliced_links = links[start:end]
     products = []
-    for link in sliced_links:
-        db_item = get_item_by_id_and_type(db, link.item_id, link.item_type)
-        if  not(db_item and (not query or query.lower() in db_item.title.lower())):
-            continue
-        total_clicks = len(link.clicks)
-        total_purchase = len(link.purchases)
-        total_earnings = sum(purchase.amount for purchase in link.purchases)
-        conversions = (total_purchase / total_clicks) * 100 if total_clicks else 0
-
+    for row in rows:
+        conversions = (row.purchases / row.clicks) * 100 if row.clicks else 0
         products.append({
-            "id": link.id,
-            "name": db_item.title if db_item else "Unknown",
-            "clicks": total_clicks,
+            "id": row.id,
+            "name": row.name,
+            "clicks": row.clicks,
             "conversions": round(conversions, 2),
-            "earnings": round(total_earnings, 2),
-            "item_type": link.item_type,
-            "item_id": link.item_id,
+            "earnings": round(row.earnings, 2),
+            "item_type": row.item_type,
+            "item_id": row.item_id,
         })
 
     total_pages = (total + limit - 1) // limit
@@ -422,7 +398,7 @@ def get_withdraw_summary(db: Session, user: User):
     ).scalar()
 
     total_earnings = affiliate_account.total_earnings if affiliate_account else 0
-    balance = affiliate_account.balance
+    balance = affiliate_account.balance if affiliate_account else 0
 
     return {
         "total_withdrawn": total_withdrawn,
@@ -441,3 +417,39 @@ def get_account_details(db:Session,user:User):
         "bank_details": BankAccountResponse.from_orm(bank).dict() if bank else None
     }
 
+def build_affiliate_dashboard(db: Session, user: User):
+    # fetch the cards details
+    response = {
+        "overview":{},
+        "line_graph":{},
+        "bar_graph":{},
+        "recent_activity":[{}]
+    }
+    response['overview']['total_earnings'] = get_total_earnings(db,user)
+    total_clicks,c_clicks,l_clicks = get_total_clicks(db,user)
+    response['overview']['total_clicks'] = total_clicks
+    total_purchases,c_purchases,l_purchases = get_total_purchases(db,user)
+    response['overview']['conversion_rate'] = find_conversion_rate(total_clicks.get('value'),total_purchases,c_purchases,l_purchases,c_clicks,l_clicks)
+    response['overview']['total_active_links'] = get_total_active_links(db,user)
+    response['monthly_earnings'] = get_monthly_earnings(db,user)
+    response['performance'] = get_click_conversion_week(db,user)
+    response['products'] = get_all_products(db,user,"",page=1,limit=10)
+    response['withdraw_history'] =  get_withdraw_history(db,user,page=1,limit=10)
+    response['withdraw_summary'] =  get_withdraw_summary(db,user)
+    response['withdraw_account_details'] = get_account_details(db,user)
+    return response
+
+def _affiliate_dashboard_cache_key(user_id: int):
+    return f"affiliate-dashboard:{user_id}"
+
+def get_affiliate_dashboard(db: Session, user: User):
+    key = _affiliate_dashboard_cache_key(user.id)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = jsonable_encoder(build_affiliate_dashboard(db, user))
+        cache.set(key, snapshot, settings.AFFILIATE_DASHBOARD_CACHE_TTL)
+    return snapshot
+
+def invalidate_affiliate_dashboard(user_id: int | str | None):
+    if user_id:
+        cache.delete(_affiliate_dashboard_cache_key(int(user_id)))
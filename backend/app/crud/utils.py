@@ -2,7 +2,11 @@
 import uuid
 import os
 from core.config import settings
-from fastapi import UploadFile 
+from fastapi import UploadFile, HTTPException
+import json
+import base64
+from datetime import datetime
+from sqlalchemy import tuple_, DateTime
 from lib.boto3 import delete_from_space
 import math
 import shutil
@@ -15,7 +19,7 @@ resend.api_key = settings.RESEND_API_KEY
 
 os.makedirs(settings.MEDIA_PATH, exist_ok=True)
 
-async def upload_file(file: UploadFile, folder: str) -> str:
+def upload_file(file: UploadFile, folder: str) -> str:
     filename = f"{uuid.uuid4().hex}_{file.filename}"
     file_location = os.path.join(settings.MEDIA_PATH, folder, filename)
     folder_path = os.path.join(settings.MEDIA_PATH, folder)
@@ -24,7 +28,7 @@ async def upload_file(file: UploadFile, folder: str) -> str:
         shutil.copyfileobj(file.file, buffer)
     file_path = os.path.join(folder, filename)
     return absolute_media_url(file_path)
-async def delete_file(file_url: str):
+def delete_file(file_url: str):
     print(file_url,'-------------')
     parsed_url = urlparse(file_url)
     file_path = parsed_url.path
@@ -43,16 +47,65 @@ async def delete_file(file_url: str):
         return delete_from_space(file_url)
     return True
 
+COUNT_CAP = 10000
+
+def encode_cursor(values: list, direction: str) -> str:
+  payload = json.dumps({"v": [v.isoformat() if isinstance(v, datetime) else v for v in values], "d": direction})
+  return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, columns: list):
+  try:
+    payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    values = [
+      datetime.fromisoformat(value) if isinstance(column.type, DateTime) else value
+      for column, value in zip(columns, payload["v"])
+    ]
+    if len(values) != len(columns) or payload["d"] not in ("next", "prev"):
+      raise ValueError(cursor)
+    return values, payload["d"]
+  except (ValueError, KeyError, TypeError):
+    raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def count_query(query, mode: str = 'exact') -> int:
+  """Row count for a list query: exact COUNT, the planner's estimate, or COUNT capped at COUNT_CAP."""
+  if mode == 'approximate':
+    statement = query.order_by(None).statement
+    compiled = statement.compile(dialect=query.session.get_bind().dialect)
+    plan = query.session.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return int(plan[0]["Plan"]["Plan Rows"])
+  if mode == 'capped':
+    return query.order_by(None).limit(COUNT_CAP).count()
+  return query.count()
+
+def keyset_columns(query) -> list:
+  # (created_at, id) of the listed model; models without created_at page by id alone
+  model = query.column_descriptions[0]["entity"]
+  if hasattr(model, "created_at"):
+    return [model.created_at, model.id]
+  return [model.id]
+
 def to_pagination_response(
     query,
     schema,
     page: int,
     page_size: int,
+    cursor: str | None = None,
+    count: str = 'exact',
 ):
+  """Paginate a query into the standard list response.
+
+  Without `cursor` this is classic page/offset pagination. Passing a cursor
+  (an empty string for the first page) switches to keyset pagination over
+  (created_at, id), newest first: no OFFSET scan, and `next_cursor` /
+  `prev_cursor` in the response fetch the neighbouring pages. `count`
+  chooses how `total` is computed: 'exact', 'approximate' or 'capped'.
+  """
+  total_count = count_query(query, count)
+  total_pages = math.ceil(total_count / page_size) if page_size else 0
+  if cursor is None:
     skip = (page - 1) * page_size
-    total_count = query.count()
     items = query.offset(skip).limit(page_size).all()
-    total_pages = math.ceil(total_count / page_size) if page_size else 0
     return {
         "has_prev":page > 1,
         "has_next":(page * page_size) < total_count,
@@ -62,6 +115,37 @@ def to_pagination_response(
         "limit":page_size
     }
 
+  columns = keyset_columns(query)
+  query = query.order_by(None)
+  direction = "next"
+  if cursor:
+    values, direction = decode_cursor(cursor, columns)
+    if direction == "next":
+      query = query.filter(tuple_(*columns) < tuple_(*values))
+    else:
+      query = query.filter(tuple_(*columns) > tuple_(*values))
+  if direction == "next":
+    rows = query.order_by(*[column.desc() for column in columns]).limit(page_size + 1).all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    has_next, has_prev = has_more, bool(cursor)
+  else:
+    rows = query.order_by(*[column.asc() for column in columns]).limit(page_size + 1).all()
+    has_more = len(rows) > page_size
+    rows = list(reversed(rows[:page_size]))
+    has_next, has_prev = True, has_more
+  key = lambda row: [getattr(row, column.key) for column in columns]
+  return {
+      "has_prev":has_prev,
+      "has_next":has_next,
+      "total":total_count,
+      "items":[dict(schema.from_orm(item)) for item in rows],
+      "total_pages":total_pages,
+      "limit":page_size,
+      "next_cursor":encode_cursor(key(rows[-1]), "next") if rows and has_next else None,
+      "prev_cursor":encode_cursor(key(rows[0]), "prev") if rows and has_prev else None,
+  }
+
 def send_reset_email(to_email: str, reset_link: str):
     try:
         params = {
@@ -0,0 +1,180 @@
+import traceback
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, update, func, or_, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from models.purchase import WebhookEvent
+from crud.purchase import (
+    get_transaction_processing_by_id,
+    get_transaction_by_transaction_id,
+    create_razorpay_transaction,
+    update_razorpay_transaction,
+    create_cashfree_transaction,
+    update_cashfree_transaction,
+)
+from crud.fulfillment import lock_order, fulfill_order, after_fulfillment
+
+
+def razorpay_idempotency_key(headers, data: dict) -> str:
+    event_id = headers.get("X-Razorpay-Event-Id")
+    if not event_id:
+        payment_id = data.get("payload", {}).get("payment", {}).get("entity", {}).get("id")
+        event_id = f"{data.get('event')}:{payment_id}"
+    return f"razorpay:{event_id}"
+
+def cashfree_idempotency_key(data: dict) -> str:
+    # Cashfree sends no event id; a retry repeats the same type, order, payment and status
+    order_id = data.get("data", {}).get("order", {}).get("order_id")
+    payment = data.get("data", {}).get("payment", {})
+    return f"cashfree:{data.get('type')}:{order_id}:{payment.get('cf_payment_id')}:{payment.get('payment_status')}"
+
+def create_webhook_event(db: Session, provider: str, payload: dict, event_type: str | None = None,
+                         idempotency_key: str | None = None) -> int | None:
+    """Store a webhook and return its id, or None if this delivery was already recorded."""
+    event_id = db.execute(
+        pg_insert(WebhookEvent)
+        .values(provider=provider, payload=payload, event_type=event_type, idempotency_key=idempotency_key)
+        .on_conflict_do_nothing(index_elements=[WebhookEvent.idempotency_key])
+        .returning(WebhookEvent.id)
+    ).scalar_one_or_none()
+    db.commit()
+    return event_id
+
+def claim_webhook_event(db: Session, lease_seconds: int) -> WebhookEvent | None:
+    """Lock the next due event for this worker, or return None when the inbox is idle.
+
+    Events left in `processing` longer than `lease_seconds` belong to a worker that
+    died mid-way and are claimed again.
+    """
+    now = func.now()
+    next_event = select(WebhookEvent.id).where(
+        or_(
+            and_(WebhookEvent.status == 'pending', WebhookEvent.next_attempt_at <= now),
+            and_(WebhookEvent.status == 'processing', WebhookEvent.locked_at < now - timedelta(seconds=lease_seconds)),
+        )
+    ).order_by(WebhookEvent.id).limit(1).with_for_update(skip_locked=True).scalar_subquery()
+    db_event = db.execute(
+        update(WebhookEvent)
+        .where(WebhookEvent.id == next_event)
+        .values(status='processing', attempts=WebhookEvent.attempts + 1, locked_at=now)
+        .returning(WebhookEvent)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+    db.commit()
+    return db_event
+
+def complete_webhook_event(db: Session, db_event: WebhookEvent, note: str | None = None):
+    db_event.status = 'done'
+    db_event.processed_at = datetime.now(timezone.utc)
+    db_event.last_error = note
+    db.commit()
+
+def fail_webhook_event(db: Session, db_event: WebhookEvent, error: str, max_attempts: int, backoff_seconds: float):
+    # Exponential backoff between attempts; park the event as dead once attempts run out
+    if db_event.attempts >= max_attempts:
+        db_event.status = 'dead'
+    else:
+        db_event.status = 'pending'
+        delay = backoff_seconds * (2 ** (db_event.attempts - 1))
+        db_event.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+    db_event.locked_at = None
+    db_event.last_error = error
+    db.commit()
+
+def requeue_webhook_event(db: Session, db_event: WebhookEvent):
+    db_event.status = 'pending'
+    db_event.attempts = 0
+    db_event.next_attempt_at = datetime.now(timezone.utc)
+    db_event.locked_at = None
+    db.commit()
+    db.refresh(db_event)
+    return db_event
+
+def get_webhook_event_by_id(db: Session, event_id: int):
+    return db.query(WebhookEvent).filter(WebhookEvent.id == event_id).first()
+
+def get_webhook_events(db: Session, status: str = ''):
+    query = db.query(WebhookEvent)
+    if status:
+        query = query.filter(WebhookEvent.status == status)
+    return query.order_by(WebhookEvent.id.desc())
+
+
+def process_razorpay_webhook(db: Session, data: dict) -> str | None:
+    event = data.get("event")
+    payment_entity = data["payload"]["payment"]["entity"]
+    order_id = payment_entity.get("order_id")
+    lock_order(db, order_id)
+    db_transaction_processing = get_transaction_processing_by_id(db, order_id)
+    # One transaction per payment: the first event creates it, later ones
+    # (authorized -> captured) update it. Redeliveries are dropped by idempotency_key.
+    db_transaction = get_transaction_by_transaction_id(db, payment_entity['id'])
+    if not db_transaction:
+        db_transaction = create_razorpay_transaction(
+            db=db,
+            transaction_id=payment_entity['id'],
+            txn_data=payment_entity,
+            item_id=db_transaction_processing.item_id if db_transaction_processing else None,
+            item_type=db_transaction_processing.item_type if db_transaction_processing else None,
+            commit=False
+        )
+    else:
+        update_razorpay_transaction(db, db_transaction, payment_entity, commit=False)
+    note = None
+    affiliate_user_id = None
+    if event == "payment.captured" and db_transaction_processing:
+        affiliate_user_id = db_transaction_processing.affiliate_user_id
+        _, note = fulfill_order(db, db_transaction_processing, db_transaction)
+    db.commit()
+    after_fulfillment(affiliate_user_id)
+    return note
+
+def process_cashfree_webhook(db: Session, data: dict) -> str | None:
+    order_data = data.get("data", {}).get("order", {})
+    payment_info = data.get("data", {}).get("payment", {})
+    customer_info =  data.get("data", {}).get("customer_details", {})
+    order_id = order_data.get("order_id")
+    payment_status = payment_info.get("payment_status")
+    lock_order(db, order_id)
+    db_transaction_processing = get_transaction_processing_by_id(db, order_id)
+    if not db_transaction_processing:
+        return "Transaction processing not found"
+
+    db_transaction = get_transaction_by_transaction_id(db, order_id)
+    if not db_transaction:
+        db_transaction = create_cashfree_transaction(
+                db=db,
+                transaction_id=order_id,
+                txn_data=payment_info,
+                customer_info=customer_info,
+                provider="cashfree",
+                item_id=db_transaction_processing.item_id,
+                item_type=db_transaction_processing.item_type,
+                commit=False
+            )
+    else:
+        update_cashfree_transaction(db,db_transaction, payment_info, 'cashfree',commit=False)
+    note = None
+    affiliate_user_id = None
+    if payment_status == "SUCCESS":
+        affiliate_user_id = db_transaction_processing.affiliate_user_id
+        _, note = fulfill_order(db, db_transaction_processing, db_transaction)
+    db.commit()
+    after_fulfillment(affiliate_user_id)
+    return note
+
+WEBHOOK_HANDLERS = {
+    'razorpay': process_razorpay_webhook,
+    'cashfree': process_cashfree_webhook,
+}
+
+def process_webhook_event(db: Session, db_event: WebhookEvent, max_attempts: int, backoff_seconds: float):
+    try:
+        note = WEBHOOK_HANDLERS[db_event.provider](db, db_event.payload)
+    except Exception as e:
+        traceback.print_exc()
+        db.rollback()
+        fail_webhook_event(db, db_event, f"{type(e).__name__}: {e}", max_attempts, backoff_seconds)
+        return False
+    complete_webhook_event(db, db_event, note)
+    return True
@@ -1,16 +1,102 @@
+import random
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
 from core.config import settings
+from core.cache import cache
+from core.security import decode_token
 from sqlalchemy.orm import Session
 from uuid import uuid4
-from crud.auth import update_user_password,create_user
+from crud.auth import update_user_password,create_user,invalidate_principal,verify_password
 from schemas.user import UserCreate
-engine = create_engine(settings.DATABASE_URL,pool_size=10,
-    max_overflow=20,      
-    pool_timeout=30       )
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+def is_sqlite(url) -> bool:
+    return make_url(url).get_backend_name() == 'sqlite'
+
+def make_engine(url: str, pool_size: int = 10, max_overflow: int = 20):
+    # SQLite (local replica testing) has no server-side pool to size
+    if is_sqlite(url):
+        return create_engine(url, connect_args={"check_same_thread": False})
+    return create_engine(url, pool_size=pool_size, max_overflow=max_overflow, pool_timeout=30)
+
+def async_database_url(url: str):
+    # Same database through asyncpg; asyncpg takes `ssl` where libpq takes `sslmode`
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite':
+        return url.set(drivername='sqlite+aiosqlite')
+    query = dict(url.query)
+    if 'sslmode' in query:
+        query['ssl'] = query.pop('sslmode')
+    return url.set(drivername='postgresql+asyncpg', query=query)
+
+def make_async_engine(url: str):
+    if is_sqlite(url):
+        return create_async_engine(async_database_url(url))
+    return create_async_engine(
+        async_database_url(url),
+        pool_size=settings.ASYNC_DB_POOL_SIZE,
+        max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+        pool_timeout=30)
+
+engine = make_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = make_async_engine(settings.DATABASE_URL)
+# Objects stay readable after commit; there is no implicit lazy refresh in async code
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+REPLICA_URLS = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+replica_engines = [make_engine(url, settings.REPLICA_POOL_SIZE, settings.REPLICA_MAX_OVERFLOW) for url in REPLICA_URLS]
+ReplicaSessions = [sessionmaker(autocommit=False, autoflush=False, bind=e) for e in replica_engines]
+AsyncReplicaSessions = [
+    async_sessionmaker(make_async_engine(url), autoflush=False, expire_on_commit=False)
+    for url in REPLICA_URLS
+]
+# Index-aligned with replica_engines; written by lib.replica_monitor. A replica
+# only receives reads once a lag check has passed, so none are used until then.
+replica_healthy = [False] * len(REPLICA_URLS)
+
+def healthy_replica():
+    candidates = [i for i, ok in enumerate(replica_healthy) if ok]
+    return random.choice(candidates) if candidates else None
+
+def _token_subject(request: Request):
+    authorization = request.headers.get("authorization", "")
+    if not authorization.startswith("Bearer "):
+        return None
+    return decode_token(authorization.split(" ", 1)[1])
+
+def _primary_pin_key(subject: str):
+    return f"primary-pin:{subject}"
+
+def pin_to_primary(request: Request):
+    """Send this user's reads to the primary for PRIMARY_PIN_SECONDS after a write.
+
+    Kept server-side in core.cache (use the redis backend when running several
+    workers) since the frontend does not send cookies to the API.
+    """
+    subject = _token_subject(request)
+    if subject:
+        cache.set(_primary_pin_key(subject), 1, settings.PRIMARY_PIN_SECONDS)
+
+def is_pinned_to_primary(request: Request) -> bool:
+    if request.method not in READ_METHODS:
+        return True
+    subject = _token_subject(request)
+    return bool(subject and cache.get(_primary_pin_key(subject)))
+
+def read_replica_for(request: Request):
+    """Replica index to serve this request from, or None for the primary."""
+    if not replica_engines or is_pinned_to_primary(request):
+        return None
+    return healthy_replica()
+
 def get_db():
     db = SessionLocal()
     try:
@@ -18,6 +104,32 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db(request: Request):
+    """Session for read-only endpoints.
+
+    Served by a replica within REPLICA_MAX_LAG_SECONDS when one is configured,
+    otherwise (or for a client that wrote recently) by the primary.
+    """
+    index = read_replica_for(request)
+    db = SessionLocal() if index is None else ReplicaSessions[index]()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db(request: Request):
+    """Async session for read-heavy endpoints.
+
+    Reuse the sync crud functions with `await db.run_sync(fn, *args)`; the
+    function runs on the async connection without occupying a thread, and
+    any lazy loads must happen (and results be serialised) inside it.
+    Routed to a replica the same way as `get_read_db`.
+    """
+    # The pin lookup may hit redis; keep it off the event loop
+    index = await run_in_threadpool(read_replica_for, request) if replica_engines else None
+    factory = AsyncSessionLocal if index is None else AsyncReplicaSessions[index]
+    async with factory() as db:
+        yield db
 
 
 def create_admin_user(db:Session):
@@ -30,11 +142,12 @@ def create_admin_user(db:Session):
             user_data = UserCreate(email=email, password=password, name=email.split("@")[0], phone="0000000000")
             user = create_user(db,user_data,False)
 
-        else:
+        elif not verify_password(password,user.password):
             user = update_user_password(db,user,password)
         user.is_admin = True
         db.commit() 
         db.refresh(user)
+        invalidate_principal(user.email)
     print("Admin users created or updated successfully.")
 
 create_admin_user(next(get_db()))
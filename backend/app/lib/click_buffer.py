@@ -0,0 +1,220 @@
+import logging
+import queue
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from core.config import settings
+from db.session import SessionLocal
+from models.affiliate import AffiliateLink, AffiliateLinkClick
+from crud.affiliate import upsert_affiliate_link_daily_stats
+from crud.user_dashboard import invalidate_affiliate_dashboard
+
+logger = logging.getLogger(__name__)
+
+
+class ClickBuffer:
+    """Bounded in-process queue of affiliate link clicks.
+
+    Requests only enqueue; a background thread bulk-inserts the clicks
+    (and their daily rollup) once a batch fills up or the flush interval
+    passes. Clicks that arrive while the queue is full are dropped and
+    counted. Affected affiliate dashboards are invalidated after each
+    flush. Clicks on links deleted since their id was cached are dropped
+    (and evicted from `link_cache`) rather than failing the whole batch;
+    other failures (lost connection, failover) are retried up to
+    `max_attempts` times with exponential backoff before the batch counts
+    as failed.
+    """
+
+    def __init__(self, session_factory, max_size: int, batch_size: int, flush_seconds: float, link_cache=None,
+                 max_attempts: int = 3, retry_backoff_seconds: float = 0.5):
+        self._session_factory = session_factory
+        self._link_cache = link_cache
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self._queue = queue.Queue(maxsize=max_size)
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self.flushed = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="click-buffer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        # Drain whatever is still queued before the worker exits
+        while True:
+            batch = self._take_batch(wait=False)
+            if not batch:
+                break
+            self._flush(batch)
+
+    def add(self, link_id: int, user_id: int) -> bool:
+        try:
+            self._queue.put_nowait((link_id, user_id, datetime.now(timezone.utc)))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def metrics(self):
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "queue_depth": self._queue.qsize(),
+            "max_size": self.max_size,
+            "dropped": self.dropped,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "batches": self.batches,
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._take_batch()
+            if batch:
+                self._flush(batch)
+
+    def _take_batch(self, wait: bool = True):
+        batch = []
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            try:
+                if wait:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    batch.append(self._queue.get(timeout=timeout))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, db, batch: list):
+        db.execute(
+            insert(AffiliateLinkClick),
+            [{"link_id": link_id, "created_at": clicked_at} for link_id, _, clicked_at in batch]
+        )
+        daily_clicks = Counter((link_id, clicked_at.date()) for link_id, _, clicked_at in batch)
+        upsert_affiliate_link_daily_stats(db, [
+            {"link_id": link_id, "day": day, "clicks": count, "purchases": 0, "earnings": 0}
+            for (link_id, day), count in daily_clicks.items()
+        ])
+        db.commit()
+
+    def _drop_unknown_links(self, db, batch: list):
+        link_ids = {link_id for link_id, _, _ in batch}
+        existing = set(db.scalars(select(AffiliateLink.id).where(AffiliateLink.id.in_(link_ids))))
+        unknown = link_ids - existing
+        if unknown and self._link_cache is not None:
+            self._link_cache.evict_link_ids(unknown)
+        kept = [click for click in batch if click[0] in existing]
+        with self._lock:
+            self.failed += len(batch) - len(kept)
+        return kept
+
+    def _flush_once(self, batch: list) -> list:
+        """Write the batch in a fresh session; returns the clicks actually stored."""
+        db = self._session_factory()
+        try:
+            try:
+                self._write(db, batch)
+            except IntegrityError:
+                # A stale cached link id fails the FK; retry without those clicks
+                db.rollback()
+                batch = self._drop_unknown_links(db, batch)
+                if batch:
+                    self._write(db, batch)
+            return batch
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _flush(self, batch: list):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                stored = self._flush_once(batch)
+                break
+            except Exception:
+                if attempt == self.max_attempts:
+                    logger.exception("Dropping %d clicks after %d failed flush attempts", len(batch), attempt)
+                    with self._lock:
+                        self.failed += len(batch)
+                    return
+                logger.warning("Click flush attempt %d failed, retrying", attempt, exc_info=True)
+                with self._lock:
+                    self.retries += 1
+                time.sleep(self.retry_backoff_seconds * 2 ** (attempt - 1))
+        if not stored:
+            return
+        with self._lock:
+            self.flushed += len(stored)
+            self.batches += 1
+        # After the commit; a cache hiccup here must not re-insert the batch
+        try:
+            for user_id in {user_id for _, user_id, _ in stored}:
+                invalidate_affiliate_dashboard(user_id)
+        except Exception:
+            logger.exception("Failed to invalidate affiliate dashboards after a click flush")
+
+
+class LinkIdCache:
+    """Small LRU of (affiliate user, item id, item type) -> (link id, link owner id)."""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            link = self._items.get(key)
+            if link is not None:
+                self._items.move_to_end(key)
+            return link
+
+    def set(self, key, link: tuple):
+        with self._lock:
+            self._items[key] = link
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def evict_link_ids(self, link_ids):
+        with self._lock:
+            for key in [key for key, link in self._items.items() if link[0] in link_ids]:
+                del self._items[key]
+
+
+link_id_cache = LinkIdCache()
+click_buffer = ClickBuffer(
+    SessionLocal,
+    max_size=settings.CLICK_BUFFER_MAX_SIZE,
+    batch_size=settings.CLICK_BUFFER_BATCH_SIZE,
+    flush_seconds=settings.CLICK_BUFFER_FLUSH_SECONDS,
+    link_cache=link_id_cache,
+    max_attempts=settings.CLICK_BUFFER_FLUSH_ATTEMPTS,
+    retry_backoff_seconds=settings.CLICK_BUFFER_RETRY_BACKOFF_SECONDS,
+)
@@ -0,0 +1,67 @@
+import threading
+import time
+from typing import NamedTuple
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from core.config import settings
+from models.coupon import Coupon
+
+
+class CouponRule(NamedTuple):
+    id: int
+    code: str
+    type: str
+    discount: float
+    min_purchase: float | None
+    no_of_access: int
+
+
+class CouponIndex:
+    """Process-local map of visible coupon codes to their rules.
+
+    Lookups re-check a cheap version stamp (row count, latest updated_at)
+    at most every `check_seconds`, so edits made by other processes show up
+    within that window; edits made here call `invalidate()` and apply on
+    the next lookup. Remaining uses are not cached, they live in the DB.
+    """
+
+    def __init__(self, check_seconds: float):
+        self.check_seconds = check_seconds
+        self._rules = {}
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, code: str) -> CouponRule | None:
+        if self._version is None or time.monotonic() - self._checked_at >= self.check_seconds:
+            self._sync(db)
+        return self._rules.get(code)
+
+    def invalidate(self):
+        self._version = None
+
+    def refresh(self, db: Session):
+        with self._lock:
+            self._load(db, self._current_version(db))
+
+    def _sync(self, db: Session):
+        with self._lock:
+            version = self._current_version(db)
+            if version != self._version:
+                self._load(db, version)
+            self._checked_at = time.monotonic()
+
+    def _load(self, db: Session, version):
+        rows = db.execute(select(
+            Coupon.id, Coupon.code, Coupon.type, Coupon.discount, Coupon.min_purchase, Coupon.no_of_access
+        ).where(Coupon.visible == True)).all()
+        self._rules = {row.code: CouponRule(*row) for row in rows}
+        self._version = version
+        self._checked_at = time.monotonic()
+
+    @staticmethod
+    def _current_version(db: Session):
+        return tuple(db.execute(select(func.count(Coupon.id), func.max(Coupon.updated_at))).one())
+
+
+coupon_index = CouponIndex(check_seconds=settings.COUPON_INDEX_CHECK_SECONDS)
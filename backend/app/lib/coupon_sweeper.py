@@ -0,0 +1,11 @@
+from core.config import settings
+from db.session import SessionLocal
+from crud.coupon_code import release_expired_coupon_reservations
+from lib.periodic import PeriodicTask
+
+coupon_reservation_sweeper = PeriodicTask(
+    "coupon-reservation-sweeper",
+    SessionLocal,
+    lambda db: release_expired_coupon_reservations(db, settings.COUPON_RESERVATION_TTL_MINUTES),
+    interval_seconds=settings.COUPON_SWEEP_SECONDS,
+)
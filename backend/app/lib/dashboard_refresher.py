@@ -0,0 +1,77 @@
+import threading
+import traceback
+from core.config import settings
+from db.session import SessionLocal
+from crud.admin_dashboard import (
+    refresh_admin_dashboard_snapshot,
+    request_admin_dashboard_refresh,
+    admin_dashboard_refresh_due,
+)
+
+
+class DashboardRefresher:
+    """Background thread that keeps the admin dashboard snapshot fresh.
+
+    Staleness lives in the snapshot row, not in process memory:
+    `request_refresh()` (called after purchase or withdrawal changes, from
+    API and webhook worker processes alike) stamps `refresh_requested_at`,
+    and every `min_interval_seconds` the refresher rebuilds the snapshot if
+    it has a newer request or is older than `interval_seconds`. Running the
+    refresher in several processes is harmless: whichever one rebuilds
+    first (under the advisory lock) makes the row current for the rest.
+    """
+
+    def __init__(self, session_factory, interval_seconds: float, min_interval_seconds: float):
+        self._session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self.min_interval_seconds = min_interval_seconds
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="dashboard-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def request_refresh(self):
+        db = self._session_factory()
+        try:
+            request_admin_dashboard_refresh(db)
+        except Exception:
+            # Never fail the caller's (already committed) write; the interval refresh catches up
+            traceback.print_exc()
+            db.rollback()
+        finally:
+            db.close()
+
+    def _run(self):
+        while True:
+            self.refresh_if_due()
+            if self._stop.wait(self.min_interval_seconds):
+                break
+
+    def refresh_if_due(self):
+        db = self._session_factory()
+        try:
+            if admin_dashboard_refresh_due(db, self.interval_seconds):
+                refresh_admin_dashboard_snapshot(db)
+        except Exception:
+            traceback.print_exc()
+            db.rollback()
+        finally:
+            db.close()
+
+
+dashboard_refresher = DashboardRefresher(
+    SessionLocal,
+    interval_seconds=settings.ADMIN_DASHBOARD_REFRESH_SECONDS,
+    min_interval_seconds=settings.ADMIN_DASHBOARD_MIN_REFRESH_SECONDS,
+)
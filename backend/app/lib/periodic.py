@@ -0,0 +1,38 @@
+import threading
+import traceback
+
+
+class PeriodicTask:
+    """Run `fn(db)` every `interval_seconds` on a daemon thread with its own session."""
+
+    def __init__(self, name: str, session_factory, fn, interval_seconds: float):
+        self.name = name
+        self._session_factory = session_factory
+        self._fn = fn
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            db = self._session_factory()
+            try:
+                self._fn(db)
+            except Exception:
+                traceback.print_exc()
+                db.rollback()
+            finally:
+                db.close()
@@ -0,0 +1,83 @@
+import threading
+import traceback
+from sqlalchemy import text
+from core.config import settings
+from db import session as db_session
+
+# Zero when the replica is streaming and has replayed everything it received
+# (an idle primary would otherwise make the last replay timestamp look stale).
+# A replica whose WAL receiver is down falls back to the replay age, which keeps
+# growing, so it drops out instead of serving arbitrarily stale data. NULL
+# (nothing replayed yet) counts as unhealthy.
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming')
+             AND pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+
+def replica_lag_seconds(engine) -> float | None:
+    with engine.connect() as conn:
+        if engine.dialect.name == 'sqlite':
+            # Local file copies have no replication stream; reachable means current
+            conn.execute(text("SELECT 1"))
+            return 0.0
+        lag = conn.execute(REPLICA_LAG_SQL).scalar()
+        return None if lag is None else float(lag)
+
+
+class ReplicaMonitor:
+    """Marks each read replica usable while it is reachable and within REPLICA_MAX_LAG_SECONDS.
+
+    Checks run on a daemon thread so request routing only reads a flag.
+    """
+
+    def __init__(self, engines, healthy: list, max_lag_seconds: float, interval_seconds: float):
+        self._engines = engines
+        self._healthy = healthy
+        self.max_lag_seconds = max_lag_seconds
+        self.interval_seconds = interval_seconds
+        self.lag = [None] * len(engines)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        for index, engine in enumerate(self._engines):
+            try:
+                lag = replica_lag_seconds(engine)
+            except Exception:
+                traceback.print_exc()
+                lag = None
+            self.lag[index] = lag
+            self._healthy[index] = lag is not None and lag <= self.max_lag_seconds
+
+    def start(self):
+        if not self._engines or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self.check()
+        self._thread = threading.Thread(target=self._run, name="replica-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        for index in range(len(self._healthy)):
+            self._healthy[index] = False
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.check()
+
+
+replica_monitor = ReplicaMonitor(
+    db_session.replica_engines,
+    db_session.replica_healthy,
+    max_lag_seconds=settings.REPLICA_MAX_LAG_SECONDS,
+    interval_seconds=settings.REPLICA_CHECK_SECONDS,
+)
@@ -0,0 +1,100 @@
+import threading
+import traceback
+from core.config import settings
+from db.session import SessionLocal
+from crud.webhook import claim_webhook_event, process_webhook_event
+
+
+class WebhookWorkerPool:
+    """Threads that drain the webhook inbox.
+
+    Each worker claims one due event at a time with FOR UPDATE SKIP LOCKED,
+    so any number of pools (in API processes or dedicated worker nodes) can
+    share the inbox. Idle workers poll every `poll_seconds` and are woken
+    early by `notify()` when this process receives a webhook.
+    """
+
+    def __init__(self, session_factory, workers: int, poll_seconds: float, lease_seconds: int,
+                 max_attempts: int, backoff_seconds: float):
+        self._session_factory = session_factory
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+
+    def start(self):
+        if any(thread.is_alive() for thread in self._threads):
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"webhook-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def notify(self):
+        self._wake.set()
+
+    def metrics(self):
+        return {
+            "workers": sum(thread.is_alive() for thread in self._threads),
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                handled = self.run_once()
+            except Exception:
+                traceback.print_exc()
+                handled = False
+            if not handled:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+    def run_once(self) -> bool:
+        """Process at most one event; returns False when nothing was due."""
+        db = self._session_factory()
+        try:
+            db_event = claim_webhook_event(db, self.lease_seconds)
+            if db_event is None:
+                return False
+            ok = process_webhook_event(db, db_event, self.max_attempts, self.backoff_seconds)
+            with self._lock:
+                if ok:
+                    self.processed += 1
+                else:
+                    self.failed += 1
+            return True
+        finally:
+            db.close()
+
+
+webhook_workers = WebhookWorkerPool(
+    SessionLocal,
+    workers=settings.WEBHOOK_WORKERS,
+    poll_seconds=settings.WEBHOOK_POLL_SECONDS,
+    lease_seconds=settings.WEBHOOK_LEASE_SECONDS,
+    max_attempts=settings.WEBHOOK_MAX_ATTEMPTS,
+    backoff_seconds=settings.WEBHOOK_RETRY_BACKOFF_SECONDS,
+)
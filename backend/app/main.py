@@ -1,4 +1,4 @@
-from fastapi import FastAPI
+from fastapi import FastAPI,Request
 from db.base import Base
 from db.session import engine
 from api.v1 import routes_coupon_code,routes_course,routes_ebook,routes_purchase,routes_affiliate,routes_user,routes_user_dashboard , routes_admin_dashboard
@@ -7,6 +7,16 @@ from core.config import settings
 from models import user
 import models
 from fastapi.middleware.cors import CORSMiddleware
+from lib.click_buffer import click_buffer
+from lib.dashboard_refresher import dashboard_refresher
+from core.cashfree import cashfree_client
+from lib.webhook_worker import webhook_workers
+from lib.coupon_sweeper import coupon_reservation_sweeper
+from lib.coupon_index import coupon_index
+from lib.replica_monitor import replica_monitor
+from core.hashing import shutdown_executor
+from db.session import SessionLocal,replica_engines,READ_METHODS,pin_to_primary
+from fastapi.concurrency import run_in_threadpool
 app = FastAPI()
 
 app.add_middleware(
@@ -17,6 +27,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def pin_writers_to_primary(request: Request, call_next):
+    # Replicas lag the primary slightly; let a user read their own writes
+    response = await call_next(request)
+    if replica_engines and request.method not in READ_METHODS and response.status_code < 400:
+        await run_in_threadpool(pin_to_primary, request)
+    return response
+
 app.include_router(routes_user.router , prefix='/api/v1/user',tags=['auth'])
 app.include_router(routes_coupon_code.router , prefix='/api/v1/coupon',tags=['coupon'])
 app.include_router(routes_course.router , prefix='/api/v1/course',tags=['course'])
@@ -29,4 +47,29 @@ if not settings.PRODUCTION:
     app.mount("/media", StaticFiles(directory=settings.MEDIA_PATH), name="media")
 @app.on_event("startup")
 def on_startup():
+    if settings.CLICK_BUFFER_ENABLED:
+        click_buffer.start()
+    dashboard_refresher.start()
+    if settings.WEBHOOK_WORKERS:
+        webhook_workers.start()
+    coupon_reservation_sweeper.start()
+    replica_monitor.start()
+    db = SessionLocal()
+    try:
+        coupon_index.refresh(db)
+    finally:
+        db.close()
     print("running")
+
+@app.on_event("shutdown")
+def on_shutdown():
+    click_buffer.stop()
+    dashboard_refresher.stop()
+    webhook_workers.stop()
+    coupon_reservation_sweeper.stop()
+    replica_monitor.stop()
+    shutdown_executor()
+
+@app.on_event("shutdown")
+async def close_gateway_clients():
+    await cashfree_client.aclose()
@@ -0,0 +1,60 @@
+"""Minimal stand-in for the Cashfree PG orders API, for offline checkout benchmarks.
+
+Usage (from backend/app):
+    uvicorn mocks.cashfree_server:app --port 8100 --workers 1
+    CASHFREE_TEST_BASE_URL=http://localhost:8100 uvicorn main:app
+
+Orders live in a per-process dict, so run a single worker: with more, a
+GET or a 409 -> get_order lookup can land on a worker that never saw the
+order and 404. The mock is async, so one worker handles benchmark load.
+
+MOCK_CASHFREE_LATENCY_MS adds a fixed delay to every response (default 150)
+and MOCK_CASHFREE_ERROR_RATE makes that fraction of requests return 503 to
+exercise client retries (default 0).
+"""
+import asyncio
+import os
+import random
+import uuid
+from fastapi import FastAPI, Header, HTTPException, Request
+
+LATENCY_SECONDS = float(os.getenv("MOCK_CASHFREE_LATENCY_MS", "150")) / 1000
+ERROR_RATE = float(os.getenv("MOCK_CASHFREE_ERROR_RATE", "0"))
+
+app = FastAPI(title="Mock Cashfree")
+orders = {}
+
+
+async def simulate_gateway():
+    await asyncio.sleep(LATENCY_SECONDS)
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        raise HTTPException(status_code=503, detail="Simulated gateway error")
+
+
+@app.post("/orders")
+async def create_order(request: Request, x_client_id: str = Header(None), x_client_secret: str = Header(None)):
+    if not x_client_id or not x_client_secret:
+        raise HTTPException(status_code=401, detail="authentication Failed")
+    await simulate_gateway()
+    payload = await request.json()
+    order_id = payload.get("order_id") or f"order_{uuid.uuid4().hex[:24]}"
+    if order_id in orders:
+        raise HTTPException(status_code=409, detail="order with same id is already present")
+    orders[order_id] = {
+        "cf_order_id": str(random.randint(10**9, 10**10)),
+        "order_id": order_id,
+        "order_amount": payload.get("order_amount"),
+        "order_currency": payload.get("order_currency", "INR"),
+        "customer_details": payload.get("customer_details"),
+        "order_status": "ACTIVE",
+        "payment_session_id": f"session_{uuid.uuid4().hex}",
+    }
+    return orders[order_id]
+
+
+@app.get("/orders/{order_id}")
+async def get_order(order_id: str):
+    await simulate_gateway()
+    if order_id not in orders:
+        raise HTTPException(status_code=404, detail="order not found")
+    return orders[order_id]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, UniqueConstraint
 from db.base import Base
 from models.utils import TimestampMixin,CreatedAtMixin
 from sqlalchemy.orm import relationship
@@ -55,3 +55,13 @@ class AffiliateLink(TimestampMixin,Base):
     item_type = Column(String)
     clicks = relationship("AffiliateLinkClick",back_populates='affiliate_link',cascade="all, delete-orphan")
     purchases = relationship("AffiliateLinkPurchase", back_populates="affiliate_link", cascade="all, delete-orphan")
+
+class AffiliateLinkDailyStats(Base):
+    __tablename__ = "affiliate_link_daily_stats"
+    __table_args__ = (UniqueConstraint("link_id", "day", name="uq_affiliate_link_daily_stats_link_day"),)
+    id = Column(Integer, primary_key=True)
+    link_id = Column(Integer, ForeignKey("affiliate_link.id", ondelete="CASCADE"), nullable=False, index=True)
+    day = Column(Date, nullable=False, index=True)
+    clicks = Column(Integer, nullable=False, default=0, server_default="0")
+    purchases = Column(Integer, nullable=False, default=0, server_default="0")
+    earnings = Column(Integer, nullable=False, default=0, server_default="0")
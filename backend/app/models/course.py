@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, ForeignKey,Float,Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey,Float,Boolean,Computed,Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from db.base import Base
-from sqlalchemy.orm import relationship
-from .utils import TimestampMixin
+from sqlalchemy.orm import relationship,deferred
+from .utils import TimestampMixin,SEARCH_VECTOR_EXPRESSION
 
 class CourseLandingPage(TimestampMixin,Base):
     __tablename__ = "course_landing_page"
@@ -29,6 +30,12 @@ class Course(TimestampMixin,Base):
     landing_page = relationship("CourseLandingPage", backref="course", uselist=False)
     is_new = Column(Boolean, default=True)  
     is_featured = Column(Boolean, default=False)
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_EXPRESSION, persisted=True)))
+    __table_args__ = (
+        Index('ix_course_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_course_title_trgm', 'title', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}),
+        Index('ix_course_description_trgm', 'description', postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'}),
+    )
 
 class CourseProgress(TimestampMixin, Base):
     __tablename__ = "course_progress"
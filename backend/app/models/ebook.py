@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, ForeignKey,Float,Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey,Float,Boolean,Computed,Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from db.base import Base
-from .utils import TimestampMixin
-from sqlalchemy.orm import relationship
+from .utils import TimestampMixin,SEARCH_VECTOR_EXPRESSION
+from sqlalchemy.orm import relationship,deferred
 
 class EBookLandingPage(TimestampMixin, Base):   
     __tablename__ = "ebook_landing_page"
@@ -36,6 +37,12 @@ class EBook(TimestampMixin, Base):
     intro_video = Column(String)
     is_new = Column(Boolean, default=True)
     is_featured = Column(Boolean, default=False)
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_EXPRESSION, persisted=True)))
+    __table_args__ = (
+        Index('ix_e_book_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_e_book_title_trgm', 'title', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}),
+        Index('ix_e_book_description_trgm', 'description', postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'}),
+    )
 
 
 
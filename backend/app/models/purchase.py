@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, Float, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, Float, DateTime, Index, JSON, Text, func, UniqueConstraint
 from db.base import Base
-from .utils import TimestampMixin
+from .utils import TimestampMixin,CreatedAtMixin
 from datetime import datetime
 from sqlalchemy.orm import relationship
 class Transaction(TimestampMixin,Base):
@@ -24,6 +24,11 @@ class Transaction(TimestampMixin,Base):
     item_id = Column(Integer, nullable=True)         # ID of the purchased item
     item_type = Column(String, nullable=True)        # Type of the purchased item
     purchase = relationship("Purchase", back_populates="transaction", uselist=False)
+    __table_args__ = (
+        UniqueConstraint('transaction_id', name='uq_transaction_transaction_id'),
+    )
+    # Fetch server defaults with RETURNING at flush instead of a refresh SELECT
+    __mapper_args__ = {"eager_defaults": True}
 
 
 
@@ -43,6 +48,10 @@ class Purchase(TimestampMixin,Base):
     discount = Column(Float,nullable=True)
     coupon_code = Column(String,nullable=True)
     coupon_type = Column(String,nullable=True)
+    __table_args__ = (
+        Index('ix_purchase_created_at', 'created_at'),
+    )
+    __mapper_args__ = {"eager_defaults": True}
 
 
 
@@ -59,4 +68,26 @@ class TransactionProcessing(TimestampMixin, Base):
     amount = Column(String)
     discount = Column(String)
     coupon_code = Column(String)
-    coupon_type = Column(String)
\ No newline at end of file
+    coupon_type = Column(String)
+    # True while this checkout holds one of the coupon's uses (coupon.used)
+    coupon_reserved = Column(Boolean, nullable=False, default=False, server_default='false')
+
+
+class WebhookEvent(CreatedAtMixin, Base):
+    # Inbox of raw payment gateway webhooks, fulfilled by background workers
+    __tablename__ = "webhook_event"
+    id = Column(Integer, primary_key=True, index=True)
+    provider = Column(String, nullable=False)         # 'razorpay' | 'cashfree'
+    idempotency_key = Column(String, nullable=True)   # provider + gateway event id
+    event_type = Column(String, nullable=True)
+    payload = Column(JSON, nullable=False)
+    status = Column(String, nullable=False, default='pending', server_default='pending')  # pending | processing | done | dead
+    attempts = Column(Integer, nullable=False, default=0, server_default='0')
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    __table_args__ = (
+        Index('ix_webhook_event_status_next_attempt_at', 'status', 'next_attempt_at'),
+        UniqueConstraint('idempotency_key', name='uq_webhook_event_idempotency_key'),
+    )
@@ -1,5 +1,12 @@
-from sqlalchemy import Column, DateTime, func, Integer, String, Boolean, Float, ForeignKey
+from sqlalchemy import Column, DateTime, func, Integer, String, Boolean, Float, ForeignKey, JSON
 from db.base import Base
+# Weighted tsvector over title and description, stored as a generated column on course and e_book
+SEARCH_CONFIG = 'english'
+SEARCH_VECTOR_EXPRESSION = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')"
+)
+
 class TimestampMixin:
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -13,4 +20,13 @@ class LandingPage(Base):
     sub_heading = Column(String, nullable=False)
     top_heading = Column(String, nullable=False)
     highlight_words = Column(String, nullable=False)
-    thumbnail = Column(String, nullable=False)
\ No newline at end of file
+    thumbnail = Column(String, nullable=False)
+
+class AdminDashboardSnapshot(Base):
+    # Single row (id=1) holding the last computed admin dashboard
+    __tablename__ = "admin_dashboard_snapshot"
+    id = Column(Integer, primary_key=True)
+    payload = Column(JSON, nullable=False)
+    as_of = Column(DateTime(timezone=True), nullable=False)
+    # Set by any process (API or webhook worker) whose writes make the snapshot stale
+    refresh_requested_at = Column(DateTime(timezone=True), nullable=True)
@@ -12,4 +12,9 @@ class PaginationResponse(GenericModel, Generic[T]):
   has_next:bool
   has_prev:bool
   total:int
-  items:List[T]
\ No newline at end of file
+  items:List[T]
+  next_cursor: str | None = None
+  prev_cursor: str | None = None
+
+# Values accepted for the `count` query parameter of paginated lists
+PAGINATION_COUNT_MODES = '^(exact|approximate|capped)$'
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 
 
@@ -9,6 +9,15 @@ class CouponCodeCreate(BaseModel):
   code:str
   no_of_access:int
 
+class CouponCodeBulkCreate(BaseModel):
+  prefix: str = Field('', max_length=20, regex='^[A-Za-z0-9_-]*$')
+  count: int = Field(..., ge=1, le=100000)
+  length: int = Field(8, ge=4, le=20)   # random characters after the prefix
+  discount : float
+  type : str = Field(..., regex='^(flat|percentage)$')
+  min_purchase:Optional[float]=None
+  no_of_access:int = 1
+
 class CouponCodeUpdate(BaseModel):
     type: Optional[str] = None
     discount: Optional[float] = None
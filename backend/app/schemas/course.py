@@ -110,6 +110,7 @@ class CourseLandingResponse(BaseModel):
     intro_video: str 
     is_featured: bool
     is_new : bool
+    is_purchased: bool = False
     class Config:
         orm_mode = True
 
@@ -84,6 +84,17 @@ class PurchaseCreateRequest(BaseModel):
   affiliate_user_id: int | str | None = None
   amount: float | None = None
 
+class PurchaseItemResponse(BaseModel):
+  # Just the item fields the admin purchase list shows
+  id: int
+  title: str | None = None
+  description: str | None = None
+  price: float | None = None
+  commission: float | None = None
+  thumbnail: str | None = None
+  class Config:
+    orm_mode = True
+
 class PurchaseResponse(BaseModel):
   id: int | None = None
   item_id: int | None = None
@@ -98,3 +109,17 @@ class PurchaseResponse(BaseModel):
   coupon_type : str | None = None
   class Config:
     orm_mode = True
+
+class WebhookEventResponse(BaseModel):
+  id: int
+  provider: str
+  event_type: str | None = None
+  status: str
+  attempts: int
+  next_attempt_at: datetime | None = None
+  processed_at: datetime | None = None
+  last_error: str | None = None
+  created_at: datetime | None = None
+  payload: dict | None = None
+  class Config:
+    orm_mode = True